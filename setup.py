@@ -14,17 +14,19 @@ setup(
     packages=['superbol'],
     package_data={'superbol' : ['data/sn_data.h5']},
     license='MIT License',
+    python_requires='>=3.8',
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Science/Research",
         "License :: OSI Approved :: MIT License",
         "Natural Language :: English",
-        "Programming Language :: Python :: 2.7",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
         "Topic :: Scientific/Engineering :: Astronomy",
         ],
     install_requires=[
         "astropy",
-        "scipy>=0.14",
+        "scipy>=0.18",
         "numpy",
         "extinction",
         "tables"
@@ -1,5 +1,6 @@
 import superbol.constants as constants
 import math
+import numpy as np
 
 def set_constants(color_type):
     """Sets the coefficients, validty range, and rms error of fit.
@@ -162,6 +163,110 @@ def quadrature_sum(x, y):
     """
     return math.sqrt(x**2 + y**2)
 
+def evaluate_polynomial(coefficients, variable):
+    """Evaluates a polynomial by Horner's rule.
+
+    Gives the same polynomial as :func:`calculate_polynomial`, but works on
+    whole arrays of `variable` at once and needs only one multiplication and
+    one addition per coefficient.
+
+    Args:
+        coefficients (list): list of polynomial coefficients, starting with
+            the zeroth-order term.
+        variable (float or array): Value(s) to plug in for the variable in
+            the polynomial.
+
+    Returns:
+        float or array: The value of the polynomial at each `variable`.
+    """
+    variable = np.asarray(variable, dtype=float)
+    polynomial = np.full(variable.shape, coefficients[-1], dtype=float)
+
+    for coefficient in coefficients[-2::-1]:
+        polynomial = polynomial * variable + coefficient
+
+    return polynomial[()]
+
+def _make_bc_table(color_type):
+    """Precompute the coefficients, derivative coefficients, range of
+    validity and rms error of the fit for `color_type`."""
+    coefficients, range_min, range_max, rms_err = set_constants(color_type)
+    derivative_coefficients = [order * coefficients[order]
+                               for order in range(1, len(coefficients))]
+    return (np.array(coefficients, dtype=float),
+            np.array(derivative_coefficients, dtype=float),
+            range_min, range_max, rms_err)
+
+_bc_tables = dict((color_type, _make_bc_table(color_type))
+                  for color_type in ("BminusV", "VminusI", "BminusI"))
+
+def bc_table(color_type):
+    """Gets the precomputed tables for a color combination.
+
+    Args:
+        color_type (str): A string specifying the color combination. Must be
+            "BminusV" for B-V, "VminusI" for V-I, or "BminusI" for B-I.
+
+    Returns:
+        tuple: The coefficients of the polynomial fit and of its derivative
+        (as arrays), the minimum and maximum values of the color for which
+        the polynomial is valid, and the rms error of the polynomial fit.
+
+        (coefficients, derivative_coefficients, min, max, rms_error)
+
+    Raises:
+        TypeError: The argument given is not a string
+        ValueError: The argument given is not one of the three valid
+            strings.
+    """
+    try:
+        return _bc_tables[color_type]
+    except (KeyError, TypeError):
+        # Let set_constants raise the appropriate error
+        set_constants(color_type)
+        raise
+
+def calc_bolometric_correction_array(color_values, color_errs, color_type):
+    """Calculates bolometric corrections and their uncertainties for an array
+    of colors.
+
+    The polynomial and its derivative are evaluated by Horner's rule on the
+    whole array at once, using the tables precomputed by :func:`bc_table`.
+    The uncertainties are computed as in
+    :func:`calc_bolometric_correction_err`.
+
+    Args:
+        color_values (array): B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from the
+            host and MWG.)
+        color_errs (array): Uncertainties in the photometric colors.
+        color_type (str): String signifying which color color_values
+            represent. Valid values are "BminusV" for B-V, "VminusI" for
+            V-I, and "BminusI" for B-I.
+
+    Returns:
+        tuple: A tuple of arrays containing the bolometric corrections and
+        their uncertainties. Both are NaN where the color is outside the
+        valid range of the polynomial fit.
+
+        (bolometric_correction, uncertainty)
+    """
+    coefficients, derivative_coefficients, range_min, range_max, rms_err = \
+        bc_table(color_type)
+    color_values = np.asarray(color_values, dtype=float)
+
+    bolometric_correction = evaluate_polynomial(coefficients, color_values)
+    bc_derivative = evaluate_polynomial(derivative_coefficients, color_values)
+    bc_polynomial_err = np.abs(bc_derivative) * color_errs
+    uncertainty = np.sqrt(bc_polynomial_err**2 + rms_err**2)
+
+    with np.errstate(invalid='ignore'):
+        valid = (range_min <= color_values) & (color_values <= range_max)
+    bolometric_correction = np.where(valid, bolometric_correction, np.nan)
+    uncertainty = np.where(valid, uncertainty, np.nan)
+
+    return bolometric_correction[()], uncertainty[()]
+
 def calc_bolometric_correction_err(color_value, color_err, color_type):
     """Calculates the uncertainty in the bolometric correction.
 
@@ -183,11 +288,9 @@ def calc_bolometric_correction_err(color_value, color_err, color_type):
     Returns:
         float: Uncertainty in the value of the bolometric correction
    """
-    coefficients = set_constants(color_type)[0]
-    rms_err = set_constants(color_type)[3]
+    derivative_coefficients, rms_err = bc_table(color_type)[1::3]
 
-    bc_derivative = calculate_polynomial_derivative(coefficients,
-                                                     color_value)
+    bc_derivative = evaluate_polynomial(derivative_coefficients, color_value)
     bc_polynomial_err = abs(bc_derivative) * color_err
     bolometric_correction_uncertainty = quadrature_sum(bc_polynomial_err,
                                                        rms_err)
@@ -197,6 +300,9 @@ def calc_bolometric_correction_err(color_value, color_err, color_type):
 def calc_bolometric_correction(color_value, color_err, color_type):
     """Calculates the bolometric correction, using a polynomial fit.
 
+    This is a wrapper around :func:`calc_bolometric_correction_array`, which
+    should be preferred for whole light curves.
+
     Args:
         color_value (float): B-V, V-I, or B-I color of the supernova in
             magnitudes (corrected for reddening and extinction from the
@@ -216,16 +322,10 @@ def calc_bolometric_correction(color_value, color_err, color_type):
 
         (-999, -999) if the color is outside the valid range.
     """
-    bolometric_correction = 0.0
+    bolometric_correction, uncertainty = calc_bolometric_correction_array(
+        color_value, color_err, color_type)
 
-    coefficients, range_min, range_max, rms_err = set_constants(color_type)
-
-    if valid_color(color_value, range_min, range_max):
-        bolometric_correction = calculate_polynomial(coefficients,
-                                                     color_value)
-        uncertainty = calc_bolometric_correction_err(color_value,
-                                                     color_err, color_type)
-    else:
+    if np.all(np.isnan(bolometric_correction)):
         bolometric_correction = -999
         uncertainty = -999
 
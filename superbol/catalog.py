@@ -0,0 +1,225 @@
+import fnmatch
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from superbol.datafile import SharedFile
+from superbol.sn import SN, lightcurve_dtype
+from superbol.store import PhotometryStore
+
+catalog_methods = ('qbol', 'direct', 'bc')
+
+catalog_dtype = [('name', 'U32'), ('method', 'U32')] + lightcurve_dtype
+
+
+def list_supernovae(path=None, pattern=None):
+    """List the supernovae in the HDF5 database
+
+    Args:
+        path (str): Path to the HDF5 database, the one shipped with superbol
+            by default
+        pattern (str): Shell-style wildcard (such as ``'sn199*'``) the names
+            have to match, all supernovae by default
+
+    Returns:
+        list: Sorted names of the nodes under ``/sn``.
+    """
+    with SharedFile.acquire(path) as h5file:
+        names = sorted(h5file.get_node('/sn')._v_children)
+    if pattern is not None:
+        names = fnmatch.filter(names, pattern)
+    return names
+
+
+def process_supernova(name, methods=catalog_methods, path=None,
+                      fit_method='curve_fit', Rv=3.1, write=False,
+                      store=None):
+    """Calculate the lightcurves of one supernova
+
+    Args:
+        name (str): Name of the supernova
+        methods (list): Lightcurves to calculate: ``'qbol'`` for
+            :meth:`SN.lqbol`, ``'direct'`` for :meth:`SN.lbol_direct_bh09`
+            and ``'bc'`` for :meth:`SN.lbol_bc_bh09_multi`
+        path (str): Path to the HDF5 database, the one shipped with superbol
+            by default
+        fit_method (str): How the blackbodies of the ``'direct'``
+            lightcurve are fitted (see :meth:`SN.lbol_direct_bh09`)
+        Rv (float): Ratio of total to selective extinction
+        write (bool): Also write each lightcurve to its own file, as the
+            methods of :class:`SN` do by default
+        store (PhotometryStore): Store to take the data on the supernova
+            from, instead of reading the HDF5 database
+
+    Returns:
+        array: Structured array of `catalog_dtype` with the rows of every
+        lightcurve, labeled by `name` and `method`. The lightcurves of
+        bolometric corrections are labeled ``'bc_'`` followed by the color,
+        as in ``'bc_BminusV'``.
+    """
+    lightcurves = []
+    if store is None:
+        sn = SN(name, Rv=Rv, path=path)
+    else:
+        sn = SN.from_snapshot(store.snapshot(name), Rv=Rv)
+    with sn:
+        if 'qbol' in methods:
+            sn.lqbol(write=write)
+            lightcurves.append(('qbol', sn.qbol_lc))
+        if 'direct' in methods:
+            sn.lbol_direct_bh09(fit_method, write=write)
+            lightcurves.append(('direct', sn.lc))
+        if 'bc' in methods:
+            sn.lbol_bc_bh09_multi(write=write)
+            for color_type in sorted(sn.bc_lcs):
+                lightcurves.append(('bc_' + color_type,
+                                    sn.bc_lcs[color_type]))
+
+    rows = np.zeros(sum(len(lc) for _, lc in lightcurves), dtype=catalog_dtype)
+    start = 0
+    for method, lightcurve in lightcurves:
+        end = start + len(lightcurve)
+        rows['method'][start:end] = method
+        for field, _ in lightcurve_dtype:
+            rows[field][start:end] = lightcurve[field]
+        start = end
+    rows['name'] = name
+
+    return rows
+
+
+def _process_isolated(name, kwargs):
+    """Run :func:`process_supernova`, returning any error as a message"""
+    try:
+        return process_supernova(name, **kwargs), None
+    except Exception:
+        return None, traceback.format_exc()
+
+
+def _run_pool(names, kwargs, max_workers, mp_context, results, failures):
+    """Process `names` in a new pool, recording the results and failures
+
+    Returns:
+        list: Names that were not processed because a worker process died
+        and broke the pool, in the order of `names`.
+    """
+    if kwargs['store'] is None:
+        # Hold the database open in each worker for all its supernovae
+        initializer, initargs = SharedFile.keep_open, (kwargs['path'],)
+    else:
+        initializer, initargs = None, ()
+
+    broken = []
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                             initializer=initializer,
+                             initargs=initargs) as executor:
+        futures = [(name, executor.submit(_process_isolated, name, kwargs))
+                   for name in names]
+        for name, future in futures:
+            try:
+                rows, error = future.result()
+            except BrokenProcessPool:
+                broken.append(name)
+                continue
+            except Exception as e:
+                # The result could not be sent back from the worker
+                rows, error = None, "%s: %s" % (type(e).__name__, e)
+            if error is None:
+                results[name] = rows
+            else:
+                failures[name] = error
+    return broken
+
+
+def run_catalog(names=None, methods=catalog_methods, path=None,
+                max_workers=None, fit_method='curve_fit', Rv=3.1,
+                write=False, mp_context=None, store=None):
+    """Calculate the lightcurves of many supernovae in parallel
+
+    Each supernova is processed by :func:`process_supernova` in a pool of
+    worker processes, each of which opens the database once. A supernova
+    that fails, for example because it is missing its parameters, does not
+    stop the others; it is reported in the returned failures instead.
+
+    A worker process that dies breaks the pool, and the supernovae that
+    were still queued are run again in a new one. The supernovae that were
+    being processed when it broke are first run again one at a time, each
+    in a pool of its own, so that only the one that kills its worker is
+    reported as failed.
+
+    Args:
+        names (list): Names of the supernovae, every one in the database by
+            default (see :func:`list_supernovae`)
+        methods (list): Lightcurves to calculate (see
+            :func:`process_supernova`)
+        path (str): Path to the HDF5 database, the one shipped with superbol
+            by default
+        max_workers (int): Number of worker processes, the number of CPUs by
+            default
+        fit_method (str): How the blackbodies of the ``'direct'``
+            lightcurve are fitted (see :meth:`SN.lbol_direct_bh09`)
+        Rv (float): Ratio of total to selective extinction
+        write (bool): Also write each lightcurve to its own file
+        mp_context: Multiprocessing context of the pool (see
+            ``concurrent.futures.ProcessPoolExecutor``)
+        store: A :class:`~superbol.store.PhotometryStore` to take the data
+            on the supernovae from, or the name of a backend
+            (``'shared_memory'`` or ``'memmap'``) to load one for this run
+            and free it afterwards. The data are then read from the HDF5
+            database once, and the workers share them without copying.
+            By default each worker reads the database itself.
+
+    Returns:
+        tuple: 2-tuple
+
+        * (array) Structured array of `catalog_dtype` with the lightcurves
+          of every supernova that was processed, in the order of `names`
+        * (dict) Error message of each supernova that failed, keyed by name
+
+        (lightcurves, failures)
+
+    Raises:
+        ValueError: An unknown method was requested.
+    """
+    unknown = set(methods) - set(catalog_methods)
+    if unknown:
+        raise ValueError("unknown methods: " + ", ".join(sorted(unknown)))
+    if names is None:
+        names = list_supernovae(path)
+
+    own_store = isinstance(store, str)
+    if own_store:
+        store = PhotometryStore.create(names, path=path, backend=store)
+    kwargs = dict(methods=methods, path=path, fit_method=fit_method, Rv=Rv,
+                  write=write, store=store)
+
+    results = {}
+    failures = {}
+    # Supernovae are handed to the workers in order, so the ones being
+    # processed when the pool broke are among the first that were not done
+    num_workers = max_workers or os.cpu_count() or 1
+    try:
+        pending = list(names)
+        while pending:
+            broken = _run_pool(pending, kwargs, max_workers, mp_context,
+                               results, failures)
+            for name in broken[:num_workers]:
+                if _run_pool([name], kwargs, 1, mp_context, results,
+                             failures):
+                    failures[name] = ("BrokenProcessPool: the worker process"
+                                      " died while processing " + name)
+            pending = broken[num_workers:]
+    finally:
+        if own_store:
+            store.close()
+
+    lightcurves = [results[name] for name in names if name in results]
+    if lightcurves:
+        lightcurves = np.concatenate(lightcurves)
+    else:
+        lightcurves = np.zeros(0, dtype=catalog_dtype)
+
+    return lightcurves, failures
@@ -0,0 +1,164 @@
+import os
+
+import tables as tb
+from pkg_resources import resource_filename
+
+
+def default_path():
+    """Path to the HDF5 database of supernovae shipped with superbol"""
+    return resource_filename('superbol', 'data/sn_data.h5')
+
+
+class SharedFile(object):
+    """Read-only HDF5 file shared by everything in the process that uses it
+
+    The file is opened by the first call to :meth:`acquire` with its path,
+    and later calls return the same open file with its reference count
+    increased. It is closed when every reference has been released. Node
+    lookups are cached, so finding a node a second time costs a dictionary
+    lookup.
+
+    Code that makes many short lived users of the file in turn, such as
+    ``for name in names: with SN(name) as sn: ...``, would otherwise open
+    and close it for each of them. Call :meth:`keep_open` first to hold a
+    reference for the rest of the process (or until :meth:`close_all`), so
+    that each of them only looks up its nodes in the open file.
+
+    Files opened by a parent process are not reused by forked children,
+    which open their own.
+
+    Examples:
+        >>> data = SharedFile.acquire()
+        >>> phot = data.get_node('/sn/sn1998a/phot')
+        >>> data.release()
+
+        or, to hold the file open for a whole block:
+
+        >>> with SharedFile.acquire() as data:
+        ...     phot = data.get_node('/sn/sn1998a/phot')
+
+        or, to keep it open between many SNs:
+
+        >>> SharedFile.keep_open()
+        >>> for name in ['sn1998a', 'sn2000cb']:
+        ...     with SN(name) as sn:
+        ...         sn.lqbol()
+        >>> SharedFile.close_all()
+
+    Attributes:
+        path (str): Path to the HDF5 file
+        h5file (tables.File): The open file
+        refcount (int): Number of references that have not been released
+    """
+
+    _open_files = {}
+    _kept = {}
+
+    def __init__(self, path):
+        self.path = path
+        self.h5file = tb.open_file(path, 'r')
+        self.refcount = 0
+        self.pid = os.getpid()
+        self._nodes = {}
+
+    @classmethod
+    def acquire(cls, path=None):
+        """Get a reference to the shared open file at `path`
+
+        Args:
+            path (str): Path to the HDF5 file, the database shipped with
+                superbol by default
+
+        Returns:
+            SharedFile: The shared file. Release it with :meth:`release`
+            once done.
+        """
+        path = os.path.abspath(path or default_path())
+        shared = cls._open_files.get(path)
+        if shared is None or shared.pid != os.getpid() or \
+                not shared.h5file.isopen:
+            shared = cls(path)
+            cls._open_files[path] = shared
+        shared.refcount += 1
+        return shared
+
+    @classmethod
+    def keep_open(cls, path=None):
+        """Hold a reference to the file at `path` for the rest of the process
+
+        The file then stays open when every other reference is released.
+        Calling this again for the same file does not add another reference.
+
+        Args:
+            path (str): Path to the HDF5 file, the database shipped with
+                superbol by default
+
+        Returns:
+            SharedFile: The shared file.
+        """
+        path = os.path.abspath(path or default_path())
+        kept = cls._kept.get(path)
+        if kept is None or kept is not cls._open_files.get(path) or \
+                kept.pid != os.getpid() or not kept.h5file.isopen:
+            kept = cls.acquire(path)
+            cls._kept[path] = kept
+        return kept
+
+    @classmethod
+    def close_all(cls):
+        """Close every file this process opened, whatever its references
+
+        References that are still held become stale; releasing them does
+        nothing, and the next :meth:`acquire` opens the file again.
+        """
+        for shared in list(cls._open_files.values()):
+            shared.refcount = 0
+            shared._nodes.clear()
+            if shared.pid == os.getpid() and shared.h5file.isopen:
+                shared.h5file.close()
+        cls._open_files.clear()
+        cls._kept.clear()
+
+    def release(self):
+        """Give back a reference, closing the file if it was the last one"""
+        self.refcount -= 1
+        if self.refcount <= 0:
+            self.refcount = 0
+            self._nodes.clear()
+            if self._open_files.get(self.path) is self:
+                del self._open_files[self.path]
+            if self.pid == os.getpid() and self.h5file.isopen:
+                self.h5file.close()
+
+    @property
+    def filename(self):
+        return self.h5file.filename
+
+    @property
+    def root(self):
+        return self.h5file.root
+
+    def get_node(self, where, name=None):
+        """Cached version of ``tables.File.get_node``
+
+        Args:
+            where (str): Path of the node, or of its parent if `name` is
+                given
+            name (str): Name of the node within `where`
+
+        Returns:
+            tables.Node: The node.
+
+        Raises:
+            tables.NoSuchNodeError: There is no such node in the file.
+        """
+        key = (where, name)
+        if key not in self._nodes:
+            self._nodes[key] = self.h5file.get_node(where, name)
+        return self._nodes[key]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,156 @@
+import numpy as np
+
+
+class EpochIndex(object):
+    """Grouping of observations by epoch (Julian Date)
+
+    The observations are sorted once on (jd, wavelength), or on jd alone,
+    and the boundaries of the runs of equal jd are recorded. The
+    observations of any epoch are then a contiguous slice of the sort order,
+    and a table of the position of each filter in each epoch answers which
+    filters were observed, without scanning the observations again.
+
+    Args:
+        jds (array): Julian Date of each observation
+        names (array): Filter name of each observation
+        wavelengths (array): Wavelength of each observation. If given, the
+            observations of each epoch are sorted by wavelength; otherwise
+            they keep their original order.
+
+    Attributes:
+        jds (array): The unique Julian Dates, in increasing order
+        order (array): Row indices of the observations, sorted by epoch
+        offsets (array): Index into `order` of the first observation of each
+            epoch, followed by the total number of observations
+        counts (array): Number of observations on each epoch
+        filters (array): The unique filter names
+        positions (array): Row index of the first observation of each filter
+            on each epoch, of shape ``(len(jds), len(filters))``, or -1 where
+            the filter was not observed.
+    """
+
+    def __init__(self, jds, names, wavelengths=None):
+        jds = np.asarray(jds)
+        names = np.asarray(names)
+        if wavelengths is None:
+            self.order = np.argsort(jds, kind='mergesort')
+        else:
+            self.order = np.lexsort((np.asarray(wavelengths), jds))
+
+        sorted_jds = jds[self.order]
+        starts = np.flatnonzero(
+            np.concatenate(([True], sorted_jds[1:] != sorted_jds[:-1])))
+        if len(jds) == 0:
+            starts = starts[:0]
+        self.jds = sorted_jds[starts]
+        self.offsets = np.append(starts, len(jds))
+        self.counts = np.diff(self.offsets)
+
+        self.filters, filter_ids = np.unique(names, return_inverse=True)
+        epoch_of_row = np.repeat(np.arange(len(self.jds)), self.counts)
+        self.positions = np.full((len(self.jds), len(self.filters)), -1,
+                                 dtype=int)
+        # The first of repeated observations of a filter on an epoch is the
+        # first occurrence of its (epoch, filter) key in the sort order
+        keys = epoch_of_row * len(self.filters) + filter_ids[self.order]
+        keys, first = np.unique(keys, return_index=True)
+        self.positions.flat[keys] = self.order[first]
+
+    def __len__(self):
+        return len(self.jds)
+
+    def find(self, jds):
+        """Find the epochs of Julian Dates
+
+        Args:
+            jds (array): Julian Dates, or a single one
+
+        Returns:
+            array: Index of the epoch of each Julian Date, or -1 where there
+            is none.
+        """
+        jds = np.asarray(jds)
+        if len(self.jds) == 0:
+            return np.full(jds.shape, -1, dtype=int)
+        epochs = np.minimum(np.searchsorted(self.jds, jds), len(self.jds) - 1)
+        return np.where(self.jds[epochs] == jds, epochs, -1)
+
+    def rows(self, epoch):
+        """Row indices of the observations of one epoch
+
+        Args:
+            epoch (int): Index of the epoch
+
+        Returns:
+            array: Row indices of the observations, sorted as the index.
+        """
+        return self.order[self.offsets[epoch]:self.offsets[epoch + 1]]
+
+    def filter_rows(self, name):
+        """Row index of the observation in filter `name` on each epoch
+
+        Args:
+            name (str): Filter name
+
+        Returns:
+            array: Row index of the first observation in the filter on each
+            epoch, or -1 where the filter was not observed.
+        """
+        k = np.searchsorted(self.filters, name)
+        if k < len(self.filters) and self.filters[k] == name:
+            return self.positions[:, k]
+        return np.full(len(self.jds), -1, dtype=int)
+
+    def has_filters(self, names):
+        """Find the epochs on which every one of `names` was observed
+
+        Args:
+            names (list): Filter names
+
+        Returns:
+            array: Boolean mask of the epochs.
+        """
+        observed = np.ones(len(self.jds), dtype=bool)
+        for name in names:
+            observed &= self.filter_rows(name) >= 0
+        return observed
+
+    def num_filters(self):
+        """Number of distinct filters observed on each epoch"""
+        return np.count_nonzero(self.positions >= 0, axis=1)
+
+    def gather(self, epochs=None, keep=None):
+        """Row indices of the observations of several epochs
+
+        Args:
+            epochs (array): Indices of the epochs, all of them by default.
+                Indices of -1 give empty epochs.
+            keep (array): Boolean mask over the rows of the observations
+                to include, all of them by default
+
+        Returns:
+            tuple: 2-tuple of the row indices of the observations, epoch
+            after epoch and sorted as the index within each, and the offsets
+            of the epochs within them (the index of the first observation of
+            each epoch, followed by the total number of observations).
+        """
+        if epochs is None:
+            epochs = np.arange(len(self.jds))
+        epochs = np.asarray(epochs, dtype=int)
+        found = epochs >= 0
+        epochs = np.where(found, epochs, 0)
+        counts = np.where(found, self.counts[epochs], 0) if len(self) else \
+            np.zeros(len(epochs), dtype=int)
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        positions = np.repeat(self.offsets[epochs] - offsets[:-1], counts) + \
+            np.arange(offsets[-1])
+        rows = self.order[positions]
+
+        if keep is not None:
+            kept = np.asarray(keep)[rows]
+            epoch_of_row = np.repeat(np.arange(len(epochs)), counts)
+            counts = np.bincount(epoch_of_row[kept], minlength=len(epochs))
+            offsets = np.concatenate(([0], np.cumsum(counts)))
+            rows = rows[kept]
+
+        return rows, offsets
@@ -1,7 +1,7 @@
 import numpy as np
 
-from superbol.fit_blackbody import (bb_flux_integrated, bb_total_flux,
-                                    dbb_flux_integrated_dT, dbb_total_flux_dT)
+from superbol.fit_blackbody import (bb_flux_integrated_and_derivatives,
+                                    bb_total_flux, dbb_total_flux_dT)
 
 
 def integrate_fqbol(wavelengths, fluxes, flux_uncertainties):
@@ -25,33 +25,87 @@ def integrate_fqbol(wavelengths, fluxes, flux_uncertainties):
     """
     fqbol = np.trapz(fluxes, wavelengths)
 
-    quad_terms = np.array([])
+    # Each flux enters the trapezoidal sum weighted by half the distance
+    # between its neighbours, or between itself and its only neighbour at
+    # either end
+    wavelengths = np.asanyarray(wavelengths)
+    padded_wavelengths = np.concatenate((wavelengths[:1], wavelengths,
+                                         wavelengths[-1:]))
+    half_widths = 0.5 * (padded_wavelengths[2:] - padded_wavelengths[:-2])
+    fqbol_uncertainty = np.sqrt(np.sum((half_widths * flux_uncertainties)**2))
 
-    for i, uncertainty in enumerate(flux_uncertainties):
-        if i == 0:
-            term = 0.5 * (wavelengths[i + 1] - wavelengths[i]) * uncertainty
-            quad_terms = np.append(quad_terms, term)
-        elif i == len(flux_uncertainties) - 1:
-            term = 0.5 * (wavelengths[i] - wavelengths[i - 1]) * uncertainty
-            quad_terms = np.append(quad_terms, term)
-        else:
-            term = 0.5 * (
-                wavelengths[i + 1] - wavelengths[i - 1]) * uncertainty
-            quad_terms = np.append(quad_terms, term)
-    fqbol_uncertainty = np.sqrt(np.sum(x * x for x in quad_terms))
+    return fqbol, fqbol_uncertainty
+
+
+def integrate_fqbol_batch(wavelengths, fluxes, flux_uncertainties, offsets):
+    """Calculate the trapezoidal rule integrals of the observed `fluxes` of
+    many epochs at once.
+
+    The epochs are ragged, so they are passed as flat arrays in which the
+    observations of epoch `i` are ``wavelengths[offsets[i]:offsets[i + 1]]``
+    (and likewise for `fluxes` and `flux_uncertainties`), each sorted by
+    wavelength. Every epoch gives the same result as :func:`integrate_fqbol`,
+    but the trapezoids and error terms of all epochs are computed together
+    and summed per epoch with ``np.add.reduceat``.
+
+    Args:
+        wavelengths (array): Wavelengths of all epochs, concatenated.
+        fluxes (array): Observed fluxes of all epochs, concatenated.
+        flux_uncertainties (array): Uncertainties in the observed fluxes of
+            all epochs, concatenated.
+        offsets (array): Index of the first observation of each epoch,
+            followed by the total number of observations.
+
+    Returns:
+        tuple: 2-tuple of arrays with one entry per epoch.
+
+        * The values of the integrals
+        * The uncertainties in the integrals due to uncertainties in the
+          fluxes.
+
+        (fqbol, fqbol_uncertainty)
 
-    fqbol_uncertainty = fqbol_uncertainty
+    Raises:
+        ValueError: An epoch has fewer than two observations.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    fluxes = np.asarray(fluxes, dtype=float)
+    flux_uncertainties = np.asarray(flux_uncertainties, dtype=float)
+    offsets = np.asarray(offsets)
+    starts = offsets[:-1]
+    ends = offsets[1:] - 1
+    if np.any(ends <= starts):
+        raise ValueError("every epoch needs at least two observations")
+    if len(starts) == 0:
+        return np.array([]), np.array([])
+
+    # Trapezoids between neighbouring observations, with those spanning two
+    # epochs zeroed so that each epoch sums only its own
+    trapezoids = np.diff(wavelengths) * (fluxes[1:] + fluxes[:-1]) / 2.0
+    trapezoids[ends[:-1]] = 0.0
+    fqbol = np.add.reduceat(trapezoids, starts)
+
+    index = np.arange(len(wavelengths))
+    previous = index - 1
+    previous[starts] = starts
+    following = index + 1
+    following[ends] = ends
+    half_widths = 0.5 * (wavelengths[following] - wavelengths[previous])
+    fqbol_uncertainty = np.sqrt(
+        np.add.reduceat((half_widths * flux_uncertainties)**2, starts))
 
     return fqbol, fqbol_uncertainty
 
 
-def ir_correction(temperature, T_err, angular_radius, rad_err, longest_wl):
+def ir_correction(temperature, T_err, angular_radius, rad_err, longest_wl,
+                  method='series'):
     """Apply correction for unobserved flux in the IR.
 
     After the temperature and angular radius has been found through fitting a
     blackbody to the observed fluxes, this function takes those values and
     integrates under the fitted blackbody function from the longest observed
-    wavelength out to :math:`\\lambda = \\infty`.
+    wavelength out to :math:`\\lambda = \\infty`. The arguments may also be
+    arrays, giving the corrections of many epochs at once.
 
     Args:
         temperature (float): Best fit blackbody temperature in Kelvin
@@ -59,6 +113,9 @@ def ir_correction(temperature, T_err, angular_radius, rad_err, longest_wl):
         angular_radius (float): Best fit blackbody angular radius
         rad_err (float): Uncertainty in best fit blackbody angular radius
         longest_wl (float): Longest observed wavelength
+        method (str): Engine used to integrate the blackbody, ``'series'``
+            (default) or ``'table'`` (see
+            :func:`superbol.planck.planck_integral_and_derivative_nounits`)
 
     Returns:
         tuple: 2-tuple
@@ -66,13 +123,12 @@ def ir_correction(temperature, T_err, angular_radius, rad_err, longest_wl):
         * (float): The IR correction in :math:`erg \\; s^{-1} cm^{-2}`
         * (float): The uncertainty in the IR correction in the same units
     """
-    ir_correction = bb_total_flux(temperature,
-                                  angular_radius) - bb_flux_integrated(
-                                      longest_wl, temperature, angular_radius)
+    observed_flux, dobserved_flux_dT = bb_flux_integrated_and_derivatives(
+        longest_wl, temperature, angular_radius, method=method)
+    ir_correction = bb_total_flux(temperature, angular_radius) - observed_flux
 
     T_errterm = (dbb_total_flux_dT(temperature, angular_radius) -
-                 dbb_flux_integrated_dT(longest_wl, temperature,
-                                        angular_radius)) * T_err
+                 dobserved_flux_dT) * T_err
     rad_errterm = 2 * ir_correction / angular_radius * rad_err
 
     ir_corr_err = np.sqrt(T_errterm**2 + rad_errterm**2)
@@ -81,13 +137,14 @@ def ir_correction(temperature, T_err, angular_radius, rad_err, longest_wl):
 
 
 def uv_correction_blackbody(temperature, T_err, angular_radius, rad_err,
-                            shortest_wl):
+                            shortest_wl, method='series'):
     """Apply correction for unobserved flux in the UV using the blackbody fit.
 
     After the temperature and angular radius have been found through fitting a
     blackbody to the observed fluxes, this function takes those values and
     integrates under the fitted blackbody from the shortest observed wavelength
-    down to :math:`\\lambda = 0`.
+    down to :math:`\\lambda = 0`. The arguments may also be arrays, giving
+    the corrections of many epochs at once.
 
     Args:
         temperature (float): Best fit blackbody temperature in Kelvin
@@ -95,6 +152,9 @@ def uv_correction_blackbody(temperature, T_err, angular_radius, rad_err,
         angular_radius (float): Best fit blackbody angular radius
         rad_err (float): Uncertainty in best fit blackbody angular radius
         shortest_wl (float): Shortest observed wavelength
+        method (str): Engine used to integrate the blackbody, ``'series'``
+            (default) or ``'table'`` (see
+            :func:`superbol.planck.planck_integral_and_derivative_nounits`)
 
     Returns:
         tuple: 2-tuple
@@ -102,12 +162,12 @@ def uv_correction_blackbody(temperature, T_err, angular_radius, rad_err,
         * (float): The UV correction in :math:`erg \\; s^{-1} cm^{-2}`
         * (float): The uncertainty in the UV correction in the same units
     """
-    uv_correction = bb_flux_integrated(shortest_wl, temperature,
-                                       angular_radius)
+    uv_correction, duv_dT, duv_drad = bb_flux_integrated_and_derivatives(
+        shortest_wl, temperature, angular_radius,
+        angular_radius_derivative=True, method=method)
 
-    T_errterm = dbb_flux_integrated_dT(shortest_wl, temperature,
-                                       angular_radius) * T_err
-    rad_errterm = 2 * uv_correction / angular_radius * rad_err
+    T_errterm = duv_dT * T_err
+    rad_errterm = duv_drad * rad_err
 
     uv_corr_err = np.sqrt(T_errterm**2 + rad_errterm**2)
 
@@ -120,7 +180,8 @@ def uv_correction_linear(shortest_wl, shortest_flux, shortest_flux_err):
     This function integrates under a straight line from the shortest observed
     wavelength down to :math:`f(\\lambda) = 0` at :math:`\\lambda = 2000`
     Angstroms. This approximates the effects of line blanketing in the UV as in
-    Bersten & Hamuy (2009).
+    Bersten & Hamuy (2009). The arguments may also be arrays, giving the
+    corrections of many epochs at once.
 
     Args:
         shortest_wl (float): Shortest observed wavelength
@@ -133,9 +194,62 @@ def uv_correction_linear(shortest_wl, shortest_flux, shortest_flux_err):
         * (float): The UV correction in :math:`erg \\; s^{-1} cm^{-2}`
         * (float): The uncertainty in the UV correction in the same units
     """
-    fluxes = [0.0, shortest_flux]
-    wavelengths = [2000.0, shortest_wl]
-    uv_correction = np.trapz(fluxes, wavelengths)
+    # The trapezoidal rule for the single segment from (2000, 0) to
+    # (shortest_wl, shortest_flux), written out so that it works on arrays
+    uv_correction = (shortest_wl - 2000.0) * shortest_flux / 2.0
     uv_correction_err = 0.5 * (shortest_wl - 2000.0) * shortest_flux_err
 
     return uv_correction, uv_correction_err
+
+
+def unobserved_flux_corrections(temperature, T_err, angular_radius, rad_err,
+                                shortest_wl, longest_wl, shortest_flux,
+                                shortest_flux_err, linear_uv,
+                                method='series'):
+    """Apply the IR and UV corrections for unobserved flux to many epochs at
+    once.
+
+    All arguments are arrays with one entry per epoch. The IR correction is
+    that of :func:`ir_correction`. The UV correction is that of
+    :func:`uv_correction_linear` where `linear_uv` is True, and that of
+    :func:`uv_correction_blackbody` elsewhere. Every epoch is evaluated in
+    the same vectorized calls, without branching in Python.
+
+    Args:
+        temperature (array): Best fit blackbody temperatures in Kelvin
+        T_err (array): Uncertainties in the best fit temperatures in Kelvin
+        angular_radius (array): Best fit blackbody angular radii
+        rad_err (array): Uncertainties in the best fit angular radii
+        shortest_wl (array): Shortest observed wavelengths
+        longest_wl (array): Longest observed wavelengths
+        shortest_flux (array): Fluxes used by the linear UV correction
+        shortest_flux_err (array): Uncertainties in `shortest_flux`
+        linear_uv (array): Boolean mask of the epochs that get the linear UV
+            correction
+        method (str): Engine used to integrate the blackbody, ``'series'``
+            (default) or ``'table'`` (see
+            :func:`superbol.planck.planck_integral_and_derivative_nounits`)
+
+    Returns:
+        tuple: 4-tuple of arrays
+
+        * The IR corrections in :math:`erg \\; s^{-1} cm^{-2}`
+        * The uncertainties in the IR corrections in the same units
+        * The UV corrections in :math:`erg \\; s^{-1} cm^{-2}`
+        * The uncertainties in the UV corrections in the same units
+
+        (ir_corr, ir_corr_err, uv_corr, uv_corr_err)
+    """
+    ir_corr, ir_corr_err = ir_correction(temperature, T_err, angular_radius,
+                                         rad_err, longest_wl, method=method)
+    uv_bb, uv_bb_err = uv_correction_blackbody(temperature, T_err,
+                                               angular_radius, rad_err,
+                                               shortest_wl, method=method)
+    uv_linear, uv_linear_err = uv_correction_linear(shortest_wl,
+                                                    shortest_flux,
+                                                    shortest_flux_err)
+
+    uv_corr = np.where(linear_uv, uv_linear, uv_bb)
+    uv_corr_err = np.where(linear_uv, uv_linear_err, uv_bb_err)
+
+    return ir_corr, ir_corr_err, uv_corr, uv_corr_err
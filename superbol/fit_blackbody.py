@@ -1,9 +1,16 @@
 import numpy as np
-from scipy.optimize import curve_fit
+from scipy.optimize import brentq, curve_fit, minimize_scalar
 from astropy import units as u
 from astropy import constants as const
 from superbol.planck import *
 
+# Initial guess of [temperature, angular_radius] for curve_fit, typical of an extragalactic supernova
+default_initial_guess = [5000, 1.0e-10]
+
+# Temperatures (in Kelvin) at which the variable projection fit evaluates chi-squared
+# before refining the best one.
+varpro_temperature_grid = np.geomspace(1.0e3, 1.0e6, 121)
+
 def bb_flux(wavelength, temperature, angular_radius):
     """Observed flux at `wavelength` from a blackbody of `temperature` and `angular_radius` in cgs units
 
@@ -15,48 +22,113 @@ def bb_flux(wavelength, temperature, angular_radius):
     Returns:
         Astropy Quantity: blackbody flux in :math:`erg \\; s^{-1} cm^{-2} Anstrom^{-1}`
     """
-    bb_flux = (np.pi * u.sr) * planck_function(wavelength, temperature) * (angular_radius)**2
+    bb_flux = bb_flux_nounits(wavelength, temperature, angular_radius)
 
-    return bb_flux
+    return bb_flux * (u.erg / (u.s * u.cm**2 * u.AA))
 
 def bb_flux_nounits(wavelength, temperature, angular_radius):
     """Identical to bb_flux, but returns the value rather than the Astropy Quantity.
 
     This function is needed because curve_fit() does not play nice with functions that return Astropy quantities.
+    It is also the fast path: no Quantities are built, and `wavelength`, `temperature` and `angular_radius` broadcast
+    against each other, so a whole grid of filters and temperatures can be evaluated in a single call.
+    """
+    return np.pi * planck_function_nounits(wavelength, temperature) * angular_radius**2
+
+def bb_flux_jacobian(wavelength, temperature, angular_radius):
+    """Derivatives of :func:`bb_flux_nounits` with respect to `temperature` and `angular_radius`.
+
+    With :math:`x = C_2 / \\lambda T`, the derivatives of the observed flux :math:`F = \\pi \\theta^2 B_\\lambda(T)` are
+
+    :math:`\\displaystyle\\frac{\\partial F}{\\partial T} = \\frac{F}{T} \\frac{x}{1 - e^{-x}}` and
+    :math:`\\displaystyle\\frac{\\partial F}{\\partial \\theta} = 2 \\pi \\theta B_\\lambda(T)`
+
+    These are passed to curve_fit() as the analytic Jacobian of the model, so that it does not have to be estimated by
+    finite differences.
+
+    Args:
+        wavelength (float): Wavelength in Angstroms
+        temperature (float): Temperature in Kelvin
+        angular_radius (float): Angular radius :math:`(\\theta = \\frac{R}{D})`
+
+    Returns:
+        array: The two derivatives stacked along the last axis, so a list of `wavelength` values gives an array of shape
+        ``(len(wavelength), 2)``.
     """
-    flux = bb_flux(wavelength, temperature, angular_radius)
+    wavelength = np.asarray(wavelength, dtype=float)
+    x = C2 / (wavelength * temperature)
+    B_lambda = planck_function_nounits(wavelength, temperature)
 
-    return flux.value
+    dflux_dT = np.pi * B_lambda * angular_radius**2 * x / (temperature * -np.expm1(-x))
+    dflux_dtheta = 2 * np.pi * B_lambda * angular_radius
 
-def bb_flux_integrated(wavelength, temperature, angular_radius):
+    return np.stack(np.broadcast_arrays(dflux_dT, dflux_dtheta), axis=-1)
+
+def bb_flux_integrated(wavelength, temperature, angular_radius, method='series'):
     """Integrate the planck function from :math:`\\lambda = 0` to :math:`\\lambda =` `wavelength`, then convert result to observed flux
 
     Args:
         wavelength (float): Wavelength in Angstroms
         temperature (float): Temperature in Kelvin
         angular_radius (float): Angular radius :math:`(\\theta = \\frac{R}{D})`
+        method (str): Engine used for the integrated Planck function, ``'series'`` (default) or ``'table'``
 
     Returns:
         float: Value of the integrated flux in :math:`erg \\; s^{-1} cm^{-2}`
     """
-    bb_flux_integrated = (np.pi * u.sr) * planck_integral(wavelength, temperature) * (angular_radius)**2
+    bb_flux_integrated = np.pi * planck_integral_nounits(wavelength, temperature, method) * angular_radius**2
 
-    return bb_flux_integrated.value
+    return bb_flux_integrated
 
-def dbb_flux_integrated_dT(wavelength, temperature, angular_radius):
+def dbb_flux_integrated_dT(wavelength, temperature, angular_radius, method='series'):
     """Take the derivative of the integrated planck function, then convert result to observed flux. This is used in error propagation calculations.
 
     Args:
         wavelength (float): Wavelength in Angstroms
         temperature (float): Temperature in Kelvin
         angular_radius (float): Angular radius :math:`(\\theta = \\frac{R}{D})`
+        method (str): Engine used for the integrated Planck function, ``'series'`` (default) or ``'table'``
 
     Returns:
         float: Derivative of the integrated blackbody flux at `wavelength` with respect to `temperature`
     """
-    dbb_flux_integrated_dT = (np.pi * u.sr) * d_planck_integral_dT(wavelength, temperature) * (angular_radius)**2
+    dbb_flux_integrated_dT = np.pi * d_planck_integral_dT_nounits(wavelength, temperature, method) * angular_radius**2
+
+    return dbb_flux_integrated_dT
+
+def bb_flux_integrated_and_derivatives(wavelength, temperature, angular_radius, angular_radius_derivative=False,
+                                       method='series'):
+    """Integrated blackbody flux together with its derivatives, from a single evaluation of the series.
+
+    Gives the same results as calling :func:`bb_flux_integrated` and :func:`dbb_flux_integrated_dT` with the same
+    arguments, at roughly half the cost. The derivative with respect to `angular_radius` is only returned when asked for.
+
+    Args:
+        wavelength (float): Wavelength in Angstroms
+        temperature (float): Temperature in Kelvin
+        angular_radius (float): Angular radius :math:`(\\theta = \\frac{R}{D})`
+        angular_radius_derivative (bool): Also return the derivative with respect to `angular_radius`
+        method (str): Engine used for the integrated Planck function, ``'series'`` (default) or ``'table'``
+
+    Returns:
+        tuple: 2-tuple, or 3-tuple if `angular_radius_derivative` is True
+
+        * (float): Value of the integrated flux in :math:`erg \\; s^{-1} cm^{-2}`
+        * (float): Derivative of the integrated flux with respect to `temperature`
+        * (float): Derivative of the integrated flux with respect to `angular_radius`
+
+        (flux, dflux_dT[, dflux_dtheta])
+    """
+    B_integral, dB_integral_dT = planck_integral_and_derivative_nounits(wavelength, temperature, method)
 
-    return dbb_flux_integrated_dT.value
+    flux = np.pi * B_integral * angular_radius**2
+    dflux_dT = np.pi * dB_integral_dT * angular_radius**2
+
+    if angular_radius_derivative:
+        dflux_dtheta = 2 * np.pi * B_integral * angular_radius
+        return flux, dflux_dT, dflux_dtheta
+
+    return flux, dflux_dT
 
 def bb_total_flux(temperature, angular_radius):
     """Integrate the planck function from :math:`\\lambda = 0` to :math:`\\lambda = \\infty`, then convert result to observed flux.
@@ -92,23 +164,448 @@ def dbb_total_flux_dT(temperature, angular_radius):
     bb_total_flux = bb_total_flux.to(u.erg / (u.s * u.cm**2 * u.K))
     return bb_total_flux.value
 
-def bb_fit_parameters(wavelengths, fluxes, flux_uncertainties):
+def _temperature_grid(bounds=None):
+    """The part of `varpro_temperature_grid` within the temperature `bounds`, including the bounds themselves."""
+    grid = varpro_temperature_grid
+    if bounds is None:
+        return grid
+    lower = max(bounds[0][0], grid[0])
+    upper = min(bounds[1][0], grid[-1])
+    inside = grid[(grid > lower) & (grid < upper)]
+    return np.unique(np.concatenate([[lower], inside, [upper]]))
+
+def _varpro_fit(wavelengths, fluxes, flux_uncertainties, info, bounds=None):
+    """Variable projection fit of a blackbody, used by :func:`bb_fit_parameters`.
+
+    The model :math:`F = \\theta^2 \\, \\pi B_\\lambda(T)` is linear in :math:`a = \\theta^2`. For fixed `T`, with
+    :math:`b_i = \\pi B_\\lambda(\\lambda_i, T)` and weights :math:`w_i = 1/\\sigma_i^2`, the best :math:`a` is
+    :math:`P/Q` with :math:`P = \\sum w_i b_i F_i` and :math:`Q = \\sum w_i b_i^2`, which leaves
+    :math:`\\chi^2(T) = \\sum w_i F_i^2 - P^2/Q` to be minimized over `T` alone. This is done on
+    `varpro_temperature_grid` in one vectorized evaluation, followed by a root find of :math:`d\\chi^2/dT` around
+    the best grid point.
+
+    The search over `T` is restricted to the temperature `bounds`. A best fit angular radius that is zero or outside
+    its bounds raises a RuntimeError, as do a chi-squared that cannot be evaluated anywhere on the grid and a singular
+    covariance matrix.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    fluxes = np.asarray(fluxes, dtype=float)
+    weights = 1.0 / np.asarray(flux_uncertainties, dtype=float)**2
+
+    def projection(temperature):
+        with np.errstate(over='ignore'):
+            b = bb_flux_nounits(wavelengths[..., np.newaxis], temperature, 1.0)
+        P = np.sum((weights * fluxes)[..., np.newaxis] * b, axis=0)
+        Q = np.sum(weights[..., np.newaxis] * b**2, axis=0)
+        return b, P, Q
+
+    def chi2(temperature):
+        info['nfev'] += np.size(temperature)
+        b, P, Q = projection(temperature)
+        return np.sum(weights * fluxes**2) - P**2 / Q
+
+    def dchi2_dT(temperature):
+        info['njev'] += 1
+        b, P, Q = projection(temperature)
+        db_dT = bb_flux_jacobian(wavelengths, temperature, 1.0)[:, 0]
+        dP_dT = np.sum(weights * fluxes * db_dT)
+        dQ_dT = 2 * np.sum(weights * b[:, 0] * db_dT)
+        return (P[0] * dQ_dT / Q[0] - 2 * dP_dT) * P[0] / Q[0]
+
+    grid = _temperature_grid(bounds)
+    grid_chi2 = chi2(grid)
+    if np.all(np.isnan(grid_chi2)):
+        raise RuntimeError("chi-squared is undefined at every temperature")
+    k = np.nanargmin(grid_chi2)
+    lower = grid[max(k - 1, 0)]
+    upper = grid[min(k + 1, grid.size - 1)]
+    if 0 < k < grid.size - 1 and dchi2_dT(lower) < 0 < dchi2_dT(upper):
+        temperature = brentq(dchi2_dT, lower, upper, xtol=1.0e-12 * grid[k], rtol=4 * np.finfo(float).eps)
+    else:
+        temperature = minimize_scalar(lambda T: chi2(T)[0], bounds=(lower, upper), method='bounded').x
+        # The bounded search never evaluates the ends of its interval, where the minimum is when it is on a bound
+        if grid_chi2[k] <= chi2(temperature)[0]:
+            temperature = grid[k]
+
+    b, P, Q = projection(temperature)
+    angular_radius = np.sqrt(max(P[0] / Q[0], 0.0))
+    if bounds is not None and not bounds[0][1] <= angular_radius <= bounds[1][1]:
+        raise RuntimeError("best fit angular radius %g is outside the bounds" % angular_radius)
+
+    if not angular_radius > 0:
+        raise RuntimeError("best fit angular radius is zero, so the temperature is undetermined")
+
+    info['njev'] += 1
+    jacobian = bb_flux_jacobian(wavelengths, temperature, angular_radius) * np.sqrt(weights)[:, np.newaxis]
+    try:
+        pcov = np.linalg.inv(np.dot(jacobian.T, jacobian))
+    except np.linalg.LinAlgError:
+        raise RuntimeError("the covariance of the best fit is singular")
+
+    return temperature, angular_radius, pcov
+
+def bb_fit_parameters(wavelengths, fluxes, flux_uncertainties, full_output=False, method='curve_fit', p0=None,
+                      bounds=None, max_nfev=None):
     """Fit a blackbody to observed `wavelengths` and `fluxes`.
 
-    The initial guesses for the `temperature` and `angular_radius` are :math:`T = 5000` K and :math:`\\theta = 1.0 \\times 10^{-10}`. These are typical for an extragalactic supernovae, but should be used with caution for any other objects.
+    Unless `p0` is given, the initial guesses for the `temperature` and `angular_radius` are :math:`T = 5000` K and :math:`\\theta = 1.0 \\times 10^{-10}`. These are typical for an extragalactic supernovae, but should be used with caution for any other objects.
+
+    The fit uses the analytic Jacobian from :func:`bb_flux_jacobian` rather than finite differences, which saves model evaluations on every iteration.
+
+    Two fitting engines are available:
+
+    * ``'curve_fit'`` (default) fits `temperature` and `angular_radius` together with a nonlinear least squares fit.
+    * ``'varpro'`` uses variable projection: the flux is linear in :math:`\\theta^2`, so for any temperature the best
+      :math:`\\theta^2` follows in closed form, and only a one-dimensional search over temperature remains. It needs no
+      initial guess, so it does not depend on the typical values above. The covariance is computed from the Jacobian
+      at the best fit, as curve_fit does.
+
+    With `bounds`, curve_fit uses a bounded trust region fit instead of Levenberg-Marquardt, while the variable
+    projection only searches temperatures within the bounds.
+
+    A fit that fails, for example because it runs out of its `max_nfev` budget, raises a RuntimeError, and data that
+    cannot be fitted (fewer than two observations, fluxes or wavelengths that are not finite, or uncertainties that
+    are not positive) raise a ValueError. With `full_output` it returns NaN parameters instead, and the info dict explains the failure, so that
+    one bad epoch does not stop the processing of a whole light curve.
 
     Args:
         wavelengths (list): List of wavelengths at which the fluxes were observed.
         fluxes (list): List of observed monochromatic fluxes.
+        flux_uncertainties (list): List of uncertainties in the observed fluxes.
+        full_output (bool): Also return a dict with the number of model evaluations (``'nfev'``) and Jacobian evaluations (``'njev'``) made by the fit, whether the fit succeeded (``'success'``) and the reason it failed (``'message'``).
+        method (str): Fitting engine, ``'curve_fit'`` or ``'varpro'``.
+        p0 (list): Initial guess of [`temperature`, `angular_radius`] for the ``'curve_fit'`` engine.
+        bounds (tuple): Lower and upper bounds on the parameters, ([`T_min`, `theta_min`], [`T_max`, `theta_max`]).
+        max_nfev (int): Maximum number of model evaluations of the ``'curve_fit'`` engine.
 
     Returns:
         tuple: Tuple containing the best fit `temperature`, `angular_radius`, as well as perr, a 2-tuple containing the `temperature` error and the `angular_radius` error.
 
         (temperature, angular_radius, perr)
+
+        (temperature, angular_radius, perr, info) if `full_output` is True.
+
+    Raises:
+        ValueError: `method` is not one of the fitting engines, or the data cannot be fitted and `full_output` is
+            False.
+        RuntimeError: The fit failed and `full_output` is False.
     """
-    popt, pcov = curve_fit(bb_flux_nounits, wavelengths, fluxes, p0=[5000, 1.0e-10], sigma=flux_uncertainties, absolute_sigma=True)
-    temperature = popt[0]
-    angular_radius = popt[1]
+    if method not in ('curve_fit', 'varpro'):
+        raise ValueError("method must be 'curve_fit' or 'varpro'")
+
+    info = {'nfev': 0, 'njev': 0, 'success': True, 'message': ''}
+
+    def failed(err):
+        if not full_output:
+            raise err
+        info['success'] = False
+        info['message'] = str(err)
+        return np.nan, np.nan, np.array([np.nan, np.nan]), info
+
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    fluxes = np.asarray(fluxes, dtype=float)
+    flux_uncertainties = np.asarray(flux_uncertainties, dtype=float)
+    if len(wavelengths) < 2:
+        return failed(ValueError("fewer than 2 observations"))
+    if not (np.all(np.isfinite(wavelengths)) and np.all(np.isfinite(fluxes))):
+        return failed(ValueError("wavelengths and fluxes must be finite"))
+    if not np.all(flux_uncertainties > 0) or not np.all(np.isfinite(flux_uncertainties)):
+        return failed(ValueError("flux uncertainties must be positive and finite"))
+
+    def model(wavelength, temperature, angular_radius):
+        info['nfev'] += 1
+        return bb_flux_nounits(wavelength, temperature, angular_radius)
+
+    def jacobian(wavelength, temperature, angular_radius):
+        info['njev'] += 1
+        return bb_flux_jacobian(wavelength, temperature, angular_radius)
+
+    if p0 is None:
+        p0 = default_initial_guess
+
+    kwargs = {}
+    if bounds is not None:
+        kwargs['bounds'] = bounds
+        # The parameters differ by many orders of magnitude, so the bounded fit has to scale them, and must not stop
+        # on the size of a step, which is dominated by the temperature
+        kwargs['x_scale'] = 'jac'
+        kwargs['xtol'] = None
+        p0 = np.clip(p0, bounds[0], bounds[1])
+    if max_nfev is not None:
+        # Levenberg-Marquardt (leastsq) and the bounded fit (least_squares) name the budget differently
+        kwargs['max_nfev' if bounds is not None else 'maxfev'] = max_nfev
+
+    try:
+        if method == 'varpro':
+            temperature, angular_radius, pcov = _varpro_fit(wavelengths, fluxes, flux_uncertainties, info, bounds)
+        else:
+            popt, pcov = curve_fit(model, wavelengths, fluxes, p0=p0, sigma=flux_uncertainties,
+                                   absolute_sigma=True, jac=jacobian, **kwargs)
+            temperature = popt[0]
+            angular_radius = popt[1]
+    except (RuntimeError, ValueError, np.linalg.LinAlgError) as err:
+        if not full_output:
+            raise
+        return failed(err)
+
     perr = np.sqrt(np.diag(pcov))
 
+    if full_output:
+        return temperature, angular_radius, perr, info
+
     return temperature, angular_radius, perr
+
+def wien_initial_guess(wavelengths, fluxes, num_points=3):
+    """Estimate the blackbody `temperature` and `angular_radius` from the bluest observations.
+
+    In the Wien limit :math:`x = C_2 / \\lambda T \\gg 1` the observed flux is
+    :math:`F \\approx \\pi \\theta^2 C_1 \\lambda^{-5} e^{-x}`, so :math:`\\ln(F \\lambda^5)` is linear in
+    :math:`1/\\lambda` with slope :math:`-C_2/T` and intercept :math:`\\ln(\\pi \\theta^2 C_1)`. A straight line is
+    fitted to the `num_points` shortest wavelengths. The estimate is only meant as a starting point for
+    :func:`bb_fit_parameters`.
+
+    Args:
+        wavelengths (list): List of wavelengths at which the fluxes were observed.
+        fluxes (list): List of observed monochromatic fluxes.
+        num_points (int): Number of the bluest observations to use.
+
+    Returns:
+        list: [`temperature`, `angular_radius`], or None if the bluest fluxes are not finite and positive, or do not
+        fall towards the blue as a blackbody's would.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    fluxes = np.asarray(fluxes, dtype=float)
+    bluest = np.argsort(wavelengths)[:num_points]
+    if len(bluest) < 2 or not np.all(fluxes[bluest] > 0) or not np.all(np.isfinite(fluxes[bluest])):
+        return None
+
+    slope, intercept = np.polyfit(1.0 / wavelengths[bluest], np.log(fluxes[bluest] * wavelengths[bluest]**5), 1)
+    if not slope < 0:
+        return None
+
+    return [-C2 / slope, np.sqrt(np.exp(intercept) / (np.pi * C1))]
+
+def bb_fit_parameters_sequential(wavelengths, fluxes, flux_uncertainties, offsets, full_output=False, bounds=None,
+                                 max_nfev=None):
+    """Fit a blackbody to each epoch of a light curve in turn, starting each fit from the previous one.
+
+    The epochs are passed as for :func:`bb_fit_parameters_batch`. Consecutive epochs of a light curve have similar
+    temperatures and radii, so each fit with :func:`bb_fit_parameters` starts from the solution of the previous epoch.
+    The first epoch starts from :func:`wien_initial_guess`. If a fit does not converge from that starting point, it is
+    repeated from `default_initial_guess`. An epoch that cannot be fitted from either gets NaN parameters, and the next
+    epoch starts from the last successful fit.
+
+    Args:
+        wavelengths (array): Wavelengths of all epochs, concatenated.
+        fluxes (array): Observed monochromatic fluxes of all epochs, concatenated.
+        flux_uncertainties (array): Uncertainties in the observed fluxes of all epochs, concatenated.
+        offsets (array): Index of the first observation of each epoch, followed by the total number of observations.
+        full_output (bool): Also return a list with the info dict of each fit (see :func:`bb_fit_parameters`), with
+            the additional key ``'p0'`` naming the starting point that was used: ``'previous'``, ``'wien'`` or
+            ``'default'``.
+        bounds (tuple): Bounds on the parameters, passed on to :func:`bb_fit_parameters`.
+        max_nfev (int): Maximum number of model evaluations of each fit, passed on to :func:`bb_fit_parameters`.
+
+    Returns:
+        tuple: Arrays of the best fit temperatures and angular radii and of the uncertainties perr, of shape
+        ``(n_epochs, 2)``.
+
+        (temperatures, angular_radii, perr)
+
+        (temperatures, angular_radii, perr, info) if `full_output` is True.
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    fluxes = np.asarray(fluxes, dtype=float)
+    flux_uncertainties = np.asarray(flux_uncertainties, dtype=float)
+    num_epochs = len(offsets) - 1
+
+    temperatures = np.empty(num_epochs)
+    angular_radii = np.empty(num_epochs)
+    perr = np.empty((num_epochs, 2))
+    info = []
+    previous = None
+
+    for i in range(num_epochs):
+        epoch = slice(offsets[i], offsets[i + 1])
+        if previous is not None:
+            start = 'previous'
+            p0 = previous
+        else:
+            p0 = wien_initial_guess(wavelengths[epoch], fluxes[epoch])
+            start = 'wien' if p0 is not None else 'default'
+
+        fit = bb_fit_parameters(wavelengths[epoch], fluxes[epoch], flux_uncertainties[epoch], full_output=True,
+                                p0=p0, bounds=bounds, max_nfev=max_nfev)
+        if not fit[3]['success'] and start != 'default':
+            nfev = fit[3]['nfev']
+            start = 'default'
+            fit = bb_fit_parameters(wavelengths[epoch], fluxes[epoch], flux_uncertainties[epoch], full_output=True,
+                                    bounds=bounds, max_nfev=max_nfev)
+            fit[3]['nfev'] += nfev
+
+        temperatures[i], angular_radii[i], perr[i] = fit[:3]
+        fit[3]['p0'] = start
+        info.append(fit[3])
+        if fit[3]['success']:
+            previous = [temperatures[i], np.abs(angular_radii[i])]
+
+    if full_output:
+        return temperatures, angular_radii, perr, info
+
+    return temperatures, angular_radii, perr
+
+def bb_fit_parameters_batch(wavelengths, fluxes, flux_uncertainties, offsets, max_iterations=100, xtol=1.0e-10,
+                            bounds=None, full_output=False):
+    """Fit a blackbody to every epoch of a light curve at once.
+
+    The epochs are ragged, so they are passed as flat arrays in which the observations of epoch `i` are
+    ``wavelengths[offsets[i]:offsets[i + 1]]`` (and likewise for `fluxes` and `flux_uncertainties`). All epochs are
+    fitted together with a vectorized Levenberg-Marquardt solver: the residuals and Jacobian are evaluated for every
+    observation in one call, and the :math:`2 \\times 2` normal equations of each epoch are summed with
+    ``np.add.reduceat`` and solved in closed form. There is no solver call per epoch.
+
+    The starting temperature of each epoch is the best point of `varpro_temperature_grid`, with the angular radius
+    from the closed form solution at that temperature (see :func:`bb_fit_parameters` with ``method='varpro'``), so no
+    initial guess is needed. An epoch has converged once an accepted step changes both parameters by less than `xtol`
+    relative to their values. Steps are clipped to the `bounds`, and epochs that have not converged within
+    `max_iterations` are flagged rather than raising, so one bad epoch does not hold up the others. Epochs with fewer
+    than two observations are not fitted at all; they are flagged likewise, with NaN parameters and no iterations.
+
+    Args:
+        wavelengths (array): Wavelengths of all epochs, concatenated.
+        fluxes (array): Observed monochromatic fluxes of all epochs, concatenated.
+        flux_uncertainties (array): Uncertainties in the observed fluxes of all epochs, concatenated.
+        offsets (array): Index of the first observation of each epoch, followed by the total number of observations.
+        max_iterations (int): Number of iterations after which epochs that have not converged are given up.
+        xtol (float): Relative change in the parameters at which an epoch is considered converged.
+        bounds (tuple): Lower and upper bounds on the parameters, ([`T_min`, `theta_min`], [`T_max`, `theta_max`]).
+        full_output (bool): Also return a dict holding the number of iterations each epoch took (``'nit'``).
+
+    Returns:
+        tuple: 5-tuple of arrays with one entry per epoch
+
+        * (array) best fit temperatures
+        * (array) best fit angular radii
+        * (array) covariance matrices of (temperature, angular radius), of shape ``(n_epochs, 2, 2)``
+        * (array) chi-squared of the best fits
+        * (array) boolean flags, True where the fit converged
+        * (dict) info, only if `full_output` is True
+    """
+    wavelengths = np.asarray(wavelengths, dtype=float)
+    fluxes = np.asarray(fluxes, dtype=float)
+    flux_uncertainties = np.asarray(flux_uncertainties, dtype=float)
+    offsets = np.asarray(offsets)
+    counts = np.diff(offsets)
+
+    fitted = counts >= 2
+    if not fitted.all():
+        # Fit the other epochs on their own, and flag the short ones
+        temperature = np.full(len(counts), np.nan)
+        angular_radius = np.full(len(counts), np.nan)
+        covariances = np.full((len(counts), 2, 2), np.nan)
+        current_chi2 = np.full(len(counts), np.nan)
+        converged = np.zeros(len(counts), dtype=bool)
+        iterations = np.zeros(len(counts), dtype=int)
+        if fitted.any():
+            kept = np.repeat(fitted, counts)
+            fit = bb_fit_parameters_batch(
+                wavelengths[kept], fluxes[kept], flux_uncertainties[kept],
+                np.concatenate(([0], np.cumsum(counts[fitted]))), max_iterations=max_iterations, xtol=xtol,
+                bounds=bounds, full_output=True)
+            temperature[fitted], angular_radius[fitted], covariances[fitted], current_chi2[fitted], \
+                converged[fitted] = fit[:5]
+            iterations[fitted] = fit[5]['nit']
+        if full_output:
+            return temperature, angular_radius, covariances, current_chi2, converged, {'nit': iterations}
+        return temperature, angular_radius, covariances, current_chi2, converged
+
+    inverse_sigma = 1.0 / flux_uncertainties
+    starts = offsets[:-1]
+    epoch = np.repeat(np.arange(len(counts)), counts)
+
+    def epoch_sum(values):
+        return np.add.reduceat(values, starts, axis=0)
+
+    def chi2(temperature, angular_radius):
+        with np.errstate(over='ignore'):
+            residuals = (fluxes - bb_flux_nounits(wavelengths, temperature[epoch], angular_radius[epoch])) * inverse_sigma
+        return epoch_sum(residuals**2), residuals
+
+    def normal_equations(temperature, angular_radius, residuals):
+        jacobian = bb_flux_jacobian(wavelengths, temperature[epoch], angular_radius[epoch]) * inverse_sigma[:, np.newaxis]
+        a = epoch_sum(jacobian[:, 0]**2)
+        b = epoch_sum(jacobian[:, 0] * jacobian[:, 1])
+        c = epoch_sum(jacobian[:, 1]**2)
+        g = epoch_sum(jacobian * residuals[:, np.newaxis])
+        return a, b, c, g
+
+    if bounds is None:
+        bounds = ([0.0, 0.0], [np.inf, np.inf])
+    lower = np.asarray(bounds[0], dtype=float)
+    upper = np.asarray(bounds[1], dtype=float)
+
+    # Starting point from the variable projection grid
+    grid = _temperature_grid(bounds)
+    weighted_flux = (fluxes * inverse_sigma**2)[:, np.newaxis]
+    with np.errstate(over='ignore'):
+        b_grid = bb_flux_nounits(wavelengths[:, np.newaxis], grid, 1.0)
+    P = epoch_sum(weighted_flux * b_grid)
+    Q = epoch_sum((inverse_sigma[:, np.newaxis] * b_grid)**2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        projected_chi2 = -P**2 / Q
+    best = np.argmin(np.where(np.isnan(projected_chi2), np.inf, projected_chi2), axis=1)
+    rows = np.arange(len(counts))
+    temperature = grid[best]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        angular_radius = np.clip(np.sqrt(np.maximum(P[rows, best] / Q[rows, best], 0.0)), lower[1], upper[1])
+
+    # Epochs with bad data give NaNs here, which just leave them unconverged
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        current_chi2, residuals = chi2(temperature, angular_radius)
+        damping = np.full(len(counts), 1.0e-3)
+        converged = np.zeros(len(counts), dtype=bool)
+        iterations = np.zeros(len(counts), dtype=int)
+
+        for iteration in range(max_iterations):
+            iterations[~converged] += 1
+            a, b, c, g = normal_equations(temperature, angular_radius, residuals)
+
+            # Solve the damped normal equations in variables scaled by the diagonal, for conditioning
+            scale_T = np.sqrt(a)
+            scale_theta = np.sqrt(c)
+            rho = b / (scale_T * scale_theta)
+            g_T = g[:, 0] / scale_T
+            g_theta = g[:, 1] / scale_theta
+            det = (1.0 + damping)**2 - rho**2
+            step_T = ((1.0 + damping) * g_T - rho * g_theta) / det / scale_T
+            step_theta = ((1.0 + damping) * g_theta - rho * g_T) / det / scale_theta
+
+            trial_T = np.clip(temperature + step_T, lower[0], upper[0])
+            trial_theta = np.clip(angular_radius + step_theta, lower[1], upper[1])
+            trial_chi2, trial_residuals = chi2(trial_T, trial_theta)
+
+            previous_T = temperature
+            previous_theta = angular_radius
+            accept = ~converged & (trial_T > 0) & (trial_theta > 0) & (trial_chi2 <= current_chi2)
+            temperature = np.where(accept, trial_T, temperature)
+            angular_radius = np.where(accept, trial_theta, angular_radius)
+            current_chi2 = np.where(accept, trial_chi2, current_chi2)
+            residuals = np.where(accept[epoch], trial_residuals, residuals)
+            damping = np.where(accept, damping / 10.0, damping * 10.0)
+
+            converged |= accept & (np.abs(trial_T - previous_T) <= xtol * temperature) & \
+                (np.abs(trial_theta - previous_theta) <= xtol * angular_radius)
+            if converged.all():
+                break
+
+        a, b, c, g = normal_equations(temperature, angular_radius, residuals)
+        det = a * c - b**2
+        covariances = np.empty((len(counts), 2, 2))
+        covariances[:, 0, 0] = c / det
+        covariances[:, 0, 1] = covariances[:, 1, 0] = -b / det
+        covariances[:, 1, 1] = a / det
+
+    if full_output:
+        return temperature, angular_radius, covariances, current_chi2, converged, {'nit': iterations}
+
+    return temperature, angular_radius, covariances, current_chi2, converged
@@ -1,10 +1,105 @@
-import math
+import numpy as np
 
-from superbol.bc_polynomial import calc_bolometric_correction as bc
-from superbol.bc_polynomial import quadrature_sum
+from superbol.bc_polynomial import calc_bolometric_correction_array as bc_array
 from superbol.constants import mbol_zeropoint
 
 
+def _unmask(value, uncertainty):
+    """Convert masked results of the array functions to the -999 sentinels
+    of the scalar functions."""
+    if np.all(np.ma.getmaskarray(value)):
+        return -999, -999
+    return np.ma.getdata(value)[()], np.ma.getdata(uncertainty)[()]
+
+
+def _calc_Fbol_nan(color_values, color_errs, color_type, v_magnitudes,
+                   v_magnitude_errs):
+    """Bolometric fluxes and their uncertainties as plain arrays, NaN where
+    the color is out of range."""
+    bolometric_correction, bc_err = bc_array(color_values, color_errs,
+                                             color_type)
+
+    Fbol = 10**(-0.4 * (bolometric_correction + v_magnitudes + mbol_zeropoint))
+    Fbol_uncertainty = (0.4 * np.log(10) * Fbol *
+                        np.sqrt(bc_err**2 + np.square(v_magnitude_errs)))
+
+    return Fbol, Fbol_uncertainty
+
+
+def calc_Fbol_array(color_values, color_errs, color_type, v_magnitudes,
+                    v_magnitude_errs):
+    """Calculates the bolometric fluxes of a Type II-P supernova for arrays
+    of colors and V band magnitudes, such as a whole light curve.
+
+    Args:
+        color_values (array): B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from
+            the host and MWG.)
+        color_errs (array): Uncertainties in the photometric colors.
+        color_type (str): String signifying which color color_values
+            represent. Valid values are "BminusV" for B-V, "VminusI"
+            for V-I, and "BminusI" for B-I.
+        v_magnitudes (array): Photometric magnitudes in the V band, corrected
+            for host + MWG extinction.
+        v_magnitude_errs (array): Uncertainties in the V band magnitudes
+            after correction for host + MWG extinction.
+
+    Returns:
+        tuple: A tuple of masked arrays containing the bolometric fluxes and
+        their uncertainties. Entries whose color is outside the range of
+        validity of the polynomial fit are masked.
+
+        (Fbol, uncertainty)
+    """
+    Fbol, Fbol_uncertainty = _calc_Fbol_nan(color_values, color_errs,
+                                            color_type, v_magnitudes,
+                                            v_magnitude_errs)
+
+    return np.ma.masked_invalid(Fbol), np.ma.masked_invalid(Fbol_uncertainty)
+
+
+def calc_Lbol_array(color_values, color_errs, color_type, v_magnitudes,
+                    v_magnitude_errs, distance, distance_err):
+    """Calculates the bolometric luminosities of a Type II-P supernova for
+    arrays of colors and V band magnitudes, such as a whole light curve.
+
+    Args:
+        color_values (array): B-V, V-I, or B-I colors of the supernova in
+            magnitudes (corrected for reddening and extinction from
+            the host and MWG.)
+        color_errs (array): Uncertainties in the photometric colors.
+        color_type (str): String signifying which color color_values
+            represent. Valid values are "BminusV" for B-V, "VminusI"
+            for V-I, and "BminusI" for B-I.
+        v_magnitudes (array): Photometric magnitudes in the V band, corrected
+            for host + MWG extinction.
+        v_magnitude_errs (array): Uncertainties in the V band magnitudes
+            after correction for host + MWG extinction.
+        distance (float or array): The distance to the supernova in
+            centimeters.
+        distance_err (float or array): The uncertainty in the distance to the
+            supernova.
+
+    Returns:
+        tuple: A tuple of masked arrays containing the bolometric
+        luminosities in ergs per second and their uncertainties. Entries
+        whose color is outside the range of validity of the polynomial fit
+        are masked.
+
+        (Lbol, uncertainty)
+    """
+    Fbol, Fbol_err = _calc_Fbol_nan(color_values, color_errs, color_type,
+                                    v_magnitudes, v_magnitude_errs)
+    fourPiDsquared, fourPiDsquared_err = calc_4piDsquared(distance,
+                                                          distance_err)
+
+    Lbol = Fbol * fourPiDsquared
+    Lbol_uncertainty = np.sqrt((fourPiDsquared * Fbol_err)**2 +
+                               (Fbol * fourPiDsquared_err)**2)
+
+    return np.ma.masked_invalid(Lbol), np.ma.masked_invalid(Lbol_uncertainty)
+
+
 def calc_Fbol(color_value, color_err, color_type, v_magnitude,
               v_magnitude_err):
     """Calculates the bolometric flux of a Type II-P supernova.
@@ -31,35 +126,30 @@ def calc_Fbol(color_value, color_err, color_type, v_magnitude,
         (-999, -999) if the bolometric correction calculated from the
         color_value and color_type is -999 (which means the observed
         color is outside the range of validity of the polynomial fit.)
-    """
-    bolometric_correction, bc_err = bc(color_value, color_err, color_type)
-
-    if bolometric_correction == -999:
-        Fbol = -999
-        Fbol_uncertainty = -999
-    else:
-        Fbol = 10**(-0.4 *
-                    (bolometric_correction + v_magnitude + mbol_zeropoint))
-        Fbol_uncertainty = (0.4 * math.log(10) * Fbol *
-                            math.sqrt(bc_err**2 + v_magnitude_err**2))
 
-    return Fbol, Fbol_uncertainty
+        This is a wrapper around :func:`calc_Fbol_array`.
+    """
+    return _unmask(*calc_Fbol_array(color_value, color_err, color_type,
+                                    v_magnitude, v_magnitude_err))
 
 
 def calc_4piDsquared(distance, distance_err):
     """Calculates :math:`4\\pi D^2`, to convert flux to luminosity.
 
     Args:
-        distance (float): The distance to the supernova in centimeters.
-        distance_err (float): The uncertainty in the distance to the supernova.
+        distance (float or array): The distance to the supernova in
+            centimeters.
+        distance_err (float or array): The uncertainty in the distance to the
+            supernova.
 
     Returns:
         tuple: A tuple containing the :math:`4 \\pi D^2`, and the uncertainty of this number.
 
         (4piDsquared, uncertainty)
     """
-    fourPiDsquared = 4.0 * math.pi * distance**2.0
-    fourPiDsquared_uncertainty = 8.0 * math.pi * distance * distance_err
+    fourPiDsquared = 4.0 * np.pi * np.power(distance, 2.0)
+    fourPiDsquared_uncertainty = 8.0 * np.pi * np.multiply(distance,
+                                                           distance_err)
 
     return fourPiDsquared, fourPiDsquared_uncertainty
 
@@ -92,18 +182,9 @@ def calc_Lbol(color_value, color_err, color_type, v_magnitude, v_magnitude_err,
         (-999, -999) if the bolometric correction is -999 (which means
         the observed color value is outside the range of vaidity of the
         polynomial fit used to determine the bolometric correction.)
-    """
-    Fbol, Fbol_err = calc_Fbol(color_value, color_err, color_type, v_magnitude,
-                               v_magnitude_err)
-    fourPiDsquared, fourPiDsquared_err = calc_4piDsquared(distance,
-                                                          distance_err)
 
-    if Fbol == -999:
-        Lbol = -999
-        Lbol_uncertainty = -999
-    else:
-        Lbol = Fbol * fourPiDsquared
-        Lbol_uncertainty = quadrature_sum(fourPiDsquared * Fbol_err,
-                                          Fbol * fourPiDsquared_err)
-
-    return Lbol, Lbol_uncertainty
+        This is a wrapper around :func:`calc_Lbol_array`.
+    """
+    return _unmask(*calc_Lbol_array(color_value, color_err, color_type,
+                                    v_magnitude, v_magnitude_err, distance,
+                                    distance_err))
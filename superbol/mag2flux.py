@@ -1,10 +1,12 @@
 import numpy as np
-from astropy import units as u
 
 
 def mag2flux(magnitude, uncertainty, effective_wl, flux_at_zero_mag):
     """Converts an observed magnitude in a filter band to an average flux.
 
+    This is a wrapper around :func:`mag2flux_array`. Astropy quantities are
+    accepted for `effective_wl` and `flux_at_zero_mag`, and their values used.
+
     Args:
         magnitude (float):  Apparent magnitude.
         uncertainty (float): Apparent magnitude uncertainty.
@@ -19,10 +21,96 @@ def mag2flux(magnitude, uncertainty, effective_wl, flux_at_zero_mag):
 
         (flux, flux_uncertainty)
     """
-    effective_wl = effective_wl * u.AA
-    flux_at_zero_mag = flux_at_zero_mag * (u.erg / (u.s * u.cm**2 * u.AA))
+    flux, flux_uncertainty = mag2flux_array(magnitude, uncertainty,
+                                            np.asarray(flux_at_zero_mag))
+
+    return flux[()], flux_uncertainty[()]
+
+
+def mag2flux_array(magnitudes, uncertainties, flux_at_zero_mag):
+    """Converts arrays of observed magnitudes to average fluxes.
+
+    Args:
+        magnitudes (array): Apparent magnitudes.
+        uncertainties (array): Apparent magnitude uncertainties.
+        flux_at_zero_mag (array): Flux at zero magnitude of the filter of
+            each observation, in :math:`erg \\; s^{-1} cm^{-2} Angstrom^{-1}`
+
+    Returns:
+        tuple: A tuple of two arrays:
+
+        * the fluxes in :math:`erg \\; s^{-1} cm^{-2} Angstrom^{-1}`
+        * the flux uncertainties in the same units
+
+        (flux, flux_uncertainty)
+    """
+    flux = flux_at_zero_mag * 10**(-0.4 * np.asarray(magnitudes, dtype=float))
+    flux_uncertainty = np.abs(flux * -0.4 * np.log(10) * uncertainties)
+
+    return flux, flux_uncertainty
+
+
+def lookup_filters(filter_ids, filters):
+    """Finds the row of the filter table of each observation.
+
+    The filter ids are joined to the table with a binary search, so that
+    many observations are looked up in one vectorized call.
+
+    Args:
+        filter_ids (array): Filter id of each observation.
+        filters (array): Structured array of the filters, with at least the
+            field `filter_id`.
+
+    Returns:
+        array: The row of `filters` with the filter id of each observation,
+        or -1 where there is none.
+    """
+    filter_ids = np.asarray(filter_ids)
+    if len(filters) == 0:
+        return np.full(filter_ids.shape, -1, dtype=int)
+    order = np.argsort(filters['filter_id'], kind='mergesort')
+    sorted_ids = filters['filter_id'][order]
+    position = np.clip(np.searchsorted(sorted_ids, filter_ids), 0,
+                       len(sorted_ids) - 1)
+    found = sorted_ids[position] == filter_ids
+
+    return np.where(found, order[position], -1)
+
+
+def mag2flux_batch(magnitudes, uncertainties, filter_ids, filters):
+    """Converts observed magnitudes in many filter bands to average fluxes.
+
+    Each observation is joined to its filter by `filter_id` with
+    :func:`lookup_filters`, and then all of them are converted at once
+    with :func:`mag2flux_array`.
+
+    Args:
+        magnitudes (array): Apparent magnitudes.
+        uncertainties (array): Apparent magnitude uncertainties.
+        filter_ids (array): Filter id of each observation.
+        filters (array): Structured array of the filters, with at least the
+            fields `filter_id` and `flux_zeropoint`, such as the ``filters``
+            table of the HDF5 file read into memory.
+
+    Returns:
+        tuple: A tuple of three arrays:
+
+        * the fluxes in :math:`erg \\; s^{-1} cm^{-2} Angstrom^{-1}`
+        * the flux uncertainties in the same units
+        * the row of `filters` that each observation was joined to
+
+        Observations of filters missing from `filters` get NaN fluxes and a
+        row of -1.
+
+        (flux, flux_uncertainty, filter_index)
+    """
+    filter_index = lookup_filters(filter_ids, filters)
+    found = filter_index >= 0
 
-    flux = flux_at_zero_mag * 10**(-0.4 * magnitude)
-    flux_uncertainty = np.abs(flux * -0.4 * np.log(10) * uncertainty)
+    flux_at_zero_mag = np.where(found,
+                                filters['flux_zeropoint'][filter_index],
+                                np.nan)
+    flux, flux_uncertainty = mag2flux_array(magnitudes, uncertainties,
+                                            flux_at_zero_mag)
 
-    return flux.value, flux_uncertainty.value
+    return flux, flux_uncertainty, filter_index
@@ -1,15 +1,116 @@
 import numpy as np
-import tables as tb
 from astropy import units as u
-from pkg_resources import resource_filename
 import extinction
 
-from superbol.fit_blackbody import bb_fit_parameters, bb_flux_nounits
-from superbol.luminosity import calc_Lbol
-from superbol.fbol import integrate_fqbol as fqbol_trapezoidal
-from superbol.fbol import (ir_correction, uv_correction_blackbody,
-                           uv_correction_linear)
-from superbol.mag2flux import mag2flux
+from superbol.fit_blackbody import (bb_fit_parameters,
+                                    bb_fit_parameters_batch,
+                                    bb_fit_parameters_sequential,
+                                    bb_flux_nounits)
+from superbol.datafile import SharedFile
+from superbol.epochs import EpochIndex
+from superbol.snapshot import SNSnapshot
+from superbol.luminosity import calc_Lbol_array
+from superbol.fbol import integrate_fqbol_batch as fqbol_batch
+from superbol.fbol import unobserved_flux_corrections
+from superbol.mag2flux import lookup_filters, mag2flux_array
+
+
+_filter_cache = {}
+_extinction_cache = {}
+
+lightcurve_dtype = [('jd', '>f8'), ('phase', '>f8'), ('phase_err', '>f8'),
+                    ('lbol', '>f8'), ('lbol_err', '>f8')]
+direct_lightcurve_dtype = lightcurve_dtype + [
+    ('temperature', '>f8'), ('temperature_err', '>f8'),
+    ('angular_radius', '>f8'), ('angular_radius_err', '>f8')]
+
+
+def read_filters(h5file):
+    """Read the ``filters`` table of an HDF5 file into memory
+
+    The table is the same for every supernova in the file, so it is read
+    once per file and cached. String columns are decoded from bytes. The
+    cached array is shared by every SN, so it is read-only.
+
+    Args:
+        h5file (SharedFile): The open HDF5 file
+
+    Returns:
+        array: Structured array of the filters, with the columns of the
+        ``filters`` table.
+    """
+    if h5file.filename not in _filter_cache:
+        filters = decode_strings(h5file.get_node('/filters').read())
+        filters.flags.writeable = False
+        _filter_cache[h5file.filename] = filters
+    return _filter_cache[h5file.filename]
+
+
+def decode_strings(table):
+    """Convert the bytes columns of a structured array to str columns
+
+    Args:
+        table (array): Structured array, as read from a PyTables table
+
+    Returns:
+        array: Copy of `table` in which every bytes column is a str column of
+        the same length.
+    """
+    dtype = [(field, 'U%d' % table.dtype[field].itemsize)
+             if table.dtype[field].kind == 'S' else (field, table.dtype[field])
+             for field in table.dtype.names]
+    return table.astype(dtype)
+
+
+def ccm89_extinction(wavelengths, Av, Rv):
+    """Extinction of the ccm89 model at each wavelength
+
+    The extinction only depends on the wavelength, :math:`A_V` and
+    :math:`R_V`, so it is cached for each combination of them and shared by
+    every supernova. Only the wavelengths not seen before are passed to
+    ``extinction.ccm89``, in a single call.
+
+    Args:
+        wavelengths (array): Wavelengths in Angstroms
+        Av (float): Total V band extinction in magnitudes
+        Rv (float): Ratio of total to selective extinction
+
+    Returns:
+        array: :math:`A_\\lambda` in magnitudes at each wavelength.
+    """
+    unique_wavelengths, inverse = np.unique(
+        np.asarray(wavelengths, dtype=float), return_inverse=True)
+    keys = [(wavelength, Av, Rv) for wavelength in unique_wavelengths]
+    missing = [key for key in keys if key not in _extinction_cache]
+    if missing:
+        A_lam = extinction.ccm89(
+            np.array([key[0] for key in missing]), Av, Rv)
+        _extinction_cache.update(zip(missing, A_lam))
+
+    A_lam = np.array([_extinction_cache[key] for key in keys])
+    return A_lam[inverse].reshape(np.shape(wavelengths))
+
+
+def flatten_epochs(epochs):
+    """Concatenate the observations of many epochs into flat arrays
+
+    Args:
+        epochs (list): (names, wavelengths, fluxes, flux uncertainties) of
+            each epoch, as returned by :meth:`SN.get_epoch_observations`
+
+    Returns:
+        tuple: 4-tuple of the concatenated wavelengths, fluxes and flux
+        uncertainties, and the offsets of the epochs within them (the index
+        of the first observation of each epoch, followed by the total number
+        of observations).
+    """
+    offsets = np.cumsum([0] + [len(epoch[1]) for epoch in epochs])
+    if len(epochs) == 0:
+        return np.array([]), np.array([]), np.array([]), offsets
+    wavelengths = np.concatenate([epoch[1] for epoch in epochs])
+    fluxes = np.concatenate([epoch[2] for epoch in epochs])
+    flux_errs = np.concatenate([epoch[3] for epoch in epochs])
+    return wavelengths, fluxes, flux_errs, offsets
 
 
 class SN(object):
@@ -24,6 +125,10 @@ class SN(object):
             observation along with a letter designating the order of observation
             in that year. "sn1987a" was the first SN observed in 1987.
             "sn2000cb" was the eightieth SN observed in 2000.
+        Rv (float): Ratio of total to selective extinction used to deredden
+            the fluxes, 3.1 by default.
+        path (str): Path to the HDF5 database, the one shipped with superbol
+            if None (the default).
 
     Examples:
         An example which calculates the quasi-bolometric luminosity using
@@ -54,187 +159,596 @@ class SN(object):
         =====  =========  =========
     """
 
-    def __init__(self, name):
+    def __init__(self, name, Rv=3.1, path=None):
         """Initializes the SN with supplied value for [name]"""
+        self._init_settings(name, Rv, path)
+
+        self.read_hdf5()
+
+    def _init_settings(self, name, Rv, path):
         self.name = name
+        self.path = path
+        self.Rv = Rv
         self.min_num_obs = 4
+        self.fit_bounds = None
+        self.fit_max_nfev = None
+        self._stages = {}
+        self._data_version = 0
+        self.h5file = None
+        self.phot = None
 
-        self.read_hdf5()
+    @classmethod
+    def from_snapshot(cls, snapshot, Rv=3.1):
+        """Make an SN from a snapshot, without reading the HDF5 database
 
-    def read_hdf5(self):
-        """Reads the hdf5 file and returns data on supernova matching [name]"""
-        path_to_data = resource_filename('superbol', 'data/sn_data.h5')
-        h5file = tb.open_file(path_to_data, 'r')
+        Every lightcurve method runs on the data in the snapshot as it would
+        on the database.
 
-        self.filter_table = h5file.root.filters
+        Args:
+            snapshot (SNSnapshot): The data on the supernova
+            Rv (float): Ratio of total to selective extinction
+
+        Returns:
+            SN: The supernova.
+        """
+        sn = cls.__new__(cls)
+        sn._init_settings(snapshot.name, Rv, None)
+        sn.sn_node = None
+        sn.phot_table = None
+        sn.parameter_table = None
+        sn.filter_table = None
+        sn.phot = snapshot.photometry
+        sn.filters = decode_strings(snapshot.filters)
+        sn.parameters = snapshot.parameters
+        return sn
+
+    def snapshot(self):
+        """Take a snapshot of the data on the supernova
 
-        self.sn_node = h5file.get_node('/sn', self.name)
+        Returns:
+            SNSnapshot: Plain array copy of the photometry, filters and
+            parameters, which can be pickled.
+        """
+        phot = self.phot if self.phot is not None else self.phot_table.read()
+        return SNSnapshot(self.name, phot, self.filters, self.parameters)
 
-        self.phot_table = self.sn_node.phot
-        self.parameter_table = self.sn_node.parameters
+    def __reduce__(self):
+        # Pickled through a snapshot, as the PyTables nodes can not be
+        settings = dict((key, getattr(self, key))
+                        for key in ('min_num_obs', 'fit_bounds',
+                                    'fit_max_nfev'))
+        return (SN.from_snapshot, (self.snapshot(), self.Rv), settings)
 
-    def lbol_direct_bh09(self):
-        """Calculate the bolometric lightcurve using the direct integration
-        method published in Bersten & Hamuy 2009 (2009ApJ...701..200B)
+    def _memoize(self, stage, key, compute):
+        """Compute a pipeline stage, or reuse its cached value
+
+        Args:
+            stage (str): Name of the stage
+            key (tuple): The inputs the stage depends on. The stage is
+                recomputed whenever they differ from those of the cached
+                value.
+            compute (function): Computes the value of the stage
+
+        Returns:
+            The value of the stage.
         """
+        cached = self._stages.get(stage)
+        if cached is None or cached[0] != key:
+            cached = (key, compute())
+            self._stages[stage] = cached
+        return cached[1]
+
+    @property
+    def phot(self):
+        """array: Photometry of an SN made from a snapshot, None otherwise"""
+        return self._phot
+
+    @phot.setter
+    def phot(self, value):
+        self._phot = value
+        self._data_version += 1
+
+    @property
+    def filters(self):
+        """array: Rows of the ``filters`` table, with str filter names"""
+        return self._filters
+
+    @filters.setter
+    def filters(self, value):
+        self._filters = value
+        self._data_version += 1
+
+    def _photometry_key(self):
+        # Assigning `phot` or `filters` counts as a new version of the data
+        return (self.phot_table, self._data_version)
+
+    def _extinction_key(self):
+        return (self.parameters['Av_gal'][0],
+                self.parameters['Av_host'][0])
+
+    def _fluxes_key(self):
+        return (self._photometry_key(), self._extinction_key(), self.Rv)
+
+    def _convert_and_deredden_fluxes(self):
         self.convert_magnitudes_to_fluxes()
         self.deredden_fluxes()
+        return self.converted_obs, self.obs_index
+
+    def _load_and_deredden_magnitudes(self):
+        self.get_magnitudes()
+        self.deredden_UBVRI_magnitudes()
+        return self.photometry, self.phot_index
+
+    @property
+    def fluxes(self):
+        """array: The dereddened fluxes of the observations, in the format of
+        `converted_obs`
+
+        Computed with :meth:`convert_magnitudes_to_fluxes` and
+        :meth:`deredden_fluxes` on first use, and again only if the
+        photometry, :math:`A_V` or `Rv` change. Also sets `converted_obs`
+        and `obs_index`.
+        """
+        self.converted_obs, self.obs_index = self._memoize(
+            'fluxes', self._fluxes_key(), self._convert_and_deredden_fluxes)
+        return self.converted_obs
+
+    @property
+    def magnitudes(self):
+        """array: The dereddened magnitudes of the observations, in the format
+        of `photometry`
+
+        Computed with :meth:`get_magnitudes` and
+        :meth:`deredden_UBVRI_magnitudes` on first use, and again only if the
+        photometry or :math:`A_V` change. Also sets `photometry` and
+        `phot_index`.
+        """
+        self.photometry, self.phot_index = self._memoize(
+            'magnitudes', (self._photometry_key(), self._extinction_key()),
+            self._load_and_deredden_magnitudes)
+        return self.photometry
+
+    @property
+    def lbol_jds(self):
+        """array: The epochs with enough observations to calculate Lbol
+
+        Computed with :meth:`get_lbol_epochs` from `fluxes` on first use, and
+        again only if `fluxes` or `min_num_obs` change. Also sets
+        `lbol_epochs`.
+        """
+        self.fluxes
+        self.lbol_epochs = self._memoize(
+            'lbol_epochs', (self._fluxes_key(), self.min_num_obs),
+            self._get_lbol_epochs)
+        return self.lbol_epochs
+
+    def _get_lbol_epochs(self):
         self.get_lbol_epochs()
-        self.distance_cm, self.distance_cm_err = self.get_distance_cm()
-
-        self.lc = np.array([[0.0, 0.0, 0.0, 0.0, 0.0]])
-
-        for jd in self.lbol_epochs:
-            names = np.array([
-                x['name'] for x in self.converted_obs
-                if x['jd'] == jd and x['name'] != 'z'
-            ])
-            wavelengths = np.array([
-                x['wavelength'] for x in self.converted_obs
-                if x['jd'] == jd and x['name'] != 'z'
-            ])
-            fluxes = np.array([
-                x['flux'] for x in self.converted_obs
-                if x['jd'] == jd and x['name'] != 'z'
-            ])
-            flux_errs = np.array([
-                x['uncertainty'] for x in self.converted_obs
-                if x['jd'] == jd and x['name'] != 'z'
-            ])
-
-            sort_indices = np.argsort(wavelengths)
-            wavelengths = wavelengths[sort_indices]
-            fluxes = fluxes[sort_indices]
-            flux_errs = flux_errs[sort_indices]
-
-            fqbol, fqbol_err = fqbol_trapezoidal(wavelengths, fluxes,
-                                                 flux_errs)
-            temperature, angular_radius, perr = bb_fit_parameters(
-                wavelengths, fluxes, flux_errs)
-
-            temperature_err = perr[0]
-            angular_radius_err = perr[1]
-
-            shortest_wl = np.amin(wavelengths)
-            shortest_flux = np.amin(fluxes)
-            shortest_flux_err = np.amin(flux_errs)
-            longest_wl = np.amax(wavelengths)
-
-            ir_corr, ir_corr_err = ir_correction(
+        return self.lbol_epochs
+
+    @property
+    def distance(self):
+        """tuple: The distance to the supernova and its uncertainty in cm
+
+        Computed with :meth:`get_distance_cm` on first use, and again only if
+        the distance in the parameter table changes. Also sets `distance_cm`
+        and `distance_cm_err`.
+        """
+        self.distance_cm, self.distance_cm_err = self._memoize(
+            'distance', (self.parameters['distance_Mpc'][0],
+                         self.parameters['distance_Mpc_err'][0]),
+            self.get_distance_cm)
+        return self.distance_cm, self.distance_cm_err
+
+    def read_hdf5(self):
+        """Reads the hdf5 file and returns data on supernova matching [name]
+
+        The file is shared with every other SN in the process through
+        :class:`~superbol.datafile.SharedFile`, so only the first SN opens
+        it. The reference this SN holds is given back by :meth:`close`. To
+        keep the file open between SNs that are made and closed in turn, call
+        :meth:`SharedFile.keep_open <superbol.datafile.SharedFile.keep_open>`
+        first.
+        """
+        h5file = SharedFile.acquire(self.path)
+        try:
+            self.sn_node = h5file.get_node('/sn', self.name)
+            self.phot_table = h5file.get_node('/sn/' + self.name, 'phot')
+            self.parameter_table = h5file.get_node('/sn/' + self.name,
+                                                   'parameters')
+            self.filter_table = h5file.get_node('/filters')
+            self.filters = read_filters(h5file)
+            self.parameters = self.parameter_table.read()
+        except Exception:
+            h5file.release()
+            raise
+        self.h5file = h5file
+
+    def close(self):
+        """Release the HDF5 file, closing it if no other SN is using it
+
+        Results that are already computed stay available, but stages that
+        need to read the file can not be run again.
+        """
+        if self.h5file is not None:
+            self.h5file.release()
+            self.h5file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def lbol_direct_bh09(self, fit_method='curve_fit', write=True):
+        """Calculate the bolometric lightcurve using the direct integration
+        method published in Bersten & Hamuy 2009 (2009ApJ...701..200B)
+
+        The observations of every epoch are collected first, then the
+        blackbody fits are made, and finally the quasi-bolometric fluxes and
+        the unobserved flux corrections of all epochs are computed at once
+        with :func:`~superbol.fbol.integrate_fqbol_batch` and
+        :func:`~superbol.fbol.unobserved_flux_corrections`. Epochs where the
+        blackbody fit fails are left out of the light curve and recorded in
+        `fit_log` (see :meth:`fit_blackbodies`).
+
+        Args:
+            fit_method (str): How the blackbodies are fitted. ``'curve_fit'``
+                and ``'varpro'`` fit each epoch in turn with
+                :func:`bb_fit_parameters` using that method, while
+                ``'batch'`` fits all epochs at once with
+                :func:`bb_fit_parameters_batch`, which is much faster for
+                light curves with many epochs. ``'sequential'`` uses
+                :func:`bb_fit_parameters_sequential` to start each fit from
+                the solution of the previous epoch.
+            write (bool): Write the lightcurve to file.
+        """
+        lbol_epochs = self.lbol_jds
+        distance_cm, distance_cm_err = self.distance
+
+        names, wavelengths, fluxes, flux_errs, offsets = \
+            self.gather_epoch_observations(lbol_epochs,
+                                           excluded_filters=['z'])
+        epochs = list(zip(*[np.split(column, offsets[1:-1])
+                            for column in (names, wavelengths, fluxes,
+                                           flux_errs)]))
+        fit_parameters = np.reshape(
+            self.fit_blackbodies(lbol_epochs, epochs, fit_method), (-1, 4))
+        success = self.fit_log['success']
+        jds = lbol_epochs[success]
+        temperature, temperature_err, angular_radius, angular_radius_err = \
+            fit_parameters[success].T
+
+        if len(jds) == 0:
+            self.lc = np.zeros(0, dtype=direct_lightcurve_dtype)
+            if write:
+                self.write_lbol_plaintext(self.lc, 'direct')
+            return
+
+        # Keep only the observations of the epochs with a successful fit
+        kept = np.repeat(success, np.diff(offsets))
+        names = names[kept]
+        wavelengths = wavelengths[kept]
+        fluxes = fluxes[kept]
+        flux_errs = flux_errs[kept]
+        offsets = np.concatenate(([0], np.cumsum(np.diff(offsets)[success])))
+        starts = offsets[:-1]
+        fqbol, fqbol_err = fqbol_batch(wavelengths, fluxes, flux_errs,
+                                       offsets)
+
+        shortest_wl = wavelengths[starts]
+        shortest_flux = np.minimum.reduceat(fluxes, starts)
+        shortest_flux_err = np.minimum.reduceat(flux_errs, starts)
+        longest_wl = wavelengths[offsets[1:] - 1]
+
+        # The UV correction is linear on epochs whose U band flux falls
+        # below the blackbody, as expected from line blanketing
+        epoch_index = np.repeat(np.arange(len(jds)), np.diff(offsets))
+        U_rows = np.flatnonzero(names == 'U')
+        U_epochs, first = np.unique(epoch_index[U_rows], return_index=True)
+        U_rows = U_rows[first]
+        linear_uv = np.zeros(len(jds), dtype=bool)
+        linear_uv[U_epochs] = fluxes[U_rows] < bb_flux_nounits(
+            wavelengths[U_rows], temperature[U_epochs],
+            angular_radius[U_epochs])
+
+        ir_corr, ir_corr_err, uv_corr, uv_corr_err = \
+            unobserved_flux_corrections(
                 temperature, temperature_err, angular_radius,
-                angular_radius_err, longest_wl)
-            if 'U' in names:
-                idx = np.nonzero(names == 'U')[0][0]
-                U_flux = fluxes[idx]
-                U_wl = wavelengths[idx]
-                if U_flux < bb_flux_nounits(U_wl, temperature, angular_radius):
-                    uv_corr, uv_corr_err = uv_correction_linear(
-                        shortest_wl, shortest_flux, shortest_flux_err)
-                else:
-                    uv_corr, uv_corr_err = uv_correction_blackbody(
-                        temperature, temperature_err, angular_radius,
-                        angular_radius_err, shortest_wl)
+                angular_radius_err, shortest_wl, longest_wl, shortest_flux,
+                shortest_flux_err, linear_uv)
+
+        fbol = fqbol + ir_corr + uv_corr
+        fbol_err = np.sqrt(fqbol_err**2 + ir_corr_err**2 + uv_corr_err**2)
+        lum = fbol * 4.0 * np.pi * distance_cm**2.0
+        lum_err = np.sqrt((4.0 * np.pi * distance_cm**2 * fbol_err)**2 +
+                          (8.0 * np.pi * fbol * distance_cm *
+                           distance_cm_err)**2)
+        self.lc = self.make_lightcurve(jds, lum, lum_err,
+                                       dtype=direct_lightcurve_dtype)
+        self.lc['temperature'] = temperature
+        self.lc['temperature_err'] = temperature_err
+        self.lc['angular_radius'] = angular_radius
+        self.lc['angular_radius_err'] = angular_radius_err
+
+        if write:
+            self.write_lbol_plaintext(self.lc, 'direct')
+
+    def get_epoch_observations(self, jd, excluded_filters=()):
+        """Collect the converted observations on a single epoch, sorted by
+        wavelength.
+
+        Args:
+            jd (float): Julian Date of the epoch
+            excluded_filters (list): Names of filters to leave out
+
+        Returns:
+            tuple: 4-tuple of arrays holding the filter names, wavelengths,
+            fluxes and flux uncertainties of the observations.
+        """
+        names, wavelengths, fluxes, flux_errs, offsets = \
+            self.gather_epoch_observations([jd], excluded_filters)
+
+        return names, wavelengths, fluxes, flux_errs
+
+    def gather_epoch_observations(self, jds, excluded_filters=()):
+        """Collect the converted observations of several epochs, each sorted
+        by wavelength, into flat arrays.
+
+        The observations are looked up in `obs_index`, the
+        :class:`~superbol.epochs.EpochIndex` of the converted observations.
+
+        Args:
+            jds (array): Julian Dates of the epochs
+            excluded_filters (list): Names of filters to leave out
+
+        Returns:
+            tuple: 5-tuple of arrays holding the filter names, wavelengths,
+            fluxes and flux uncertainties of the observations, epoch after
+            epoch, and the offsets of the epochs within them (the index of the
+            first observation of each epoch, followed by the total number of
+            observations). Julian Dates without observations give empty
+            epochs.
+        """
+        keep = ~np.isin(self.converted_obs['name'], list(excluded_filters))
+        rows, offsets = self.obs_index.gather(self.obs_index.find(jds), keep)
+
+        observations = self.converted_obs[rows]
+        return (observations['name'], observations['wavelength'],
+                observations['flux'], observations['uncertainty'], offsets)
+
+    def fit_blackbodies(self, jds, epochs, fit_method='curve_fit'):
+        """Fit a blackbody to the observations of each epoch
+
+        The fits are bounded by `fit_bounds` and limited to `fit_max_nfev`
+        model evaluations (iterations of the ``'batch'`` fit), both set in the
+        __init__ method. A fit that fails
+        does not raise; it is recorded in `fit_log`, a structured array with
+        one row per epoch holding the `jd`, whether the fit succeeded
+        (`success`), the number of model evaluations or iterations it took
+        (`nfev`) and the reason it failed (`message`).
+
+        Args:
+            jds (array): Julian Dates of the epochs
+            epochs (list): (names, wavelengths, fluxes, flux uncertainties)
+                of each epoch, as returned by :meth:`get_epoch_observations`
+            fit_method (str): ``'curve_fit'``, ``'varpro'``, ``'batch'`` or
+                ``'sequential'``.
+                See :meth:`lbol_direct_bh09`.
+
+        Returns:
+            list: (temperature, temperature error, angular radius, angular
+            radius error) of each epoch. These are NaN for failed fits.
+        """
+        dtype = [('jd', '>f8'), ('success', '?'), ('nfev', '>i8'),
+                 ('message', 'U128')]
+        self.fit_log = np.zeros(len(epochs), dtype=dtype)
+        self.fit_log['jd'] = jds
+        if len(epochs) == 0:
+            return []
+
+        if fit_method in ('batch', 'sequential'):
+            wavelengths, fluxes, flux_errs, offsets = flatten_epochs(epochs)
+            if fit_method == 'batch':
+                batch_options = {}
+                if self.fit_max_nfev is not None:
+                    batch_options['max_iterations'] = self.fit_max_nfev
+                temperatures, angular_radii, covariances, chi2, converged, \
+                    info = bb_fit_parameters_batch(
+                        wavelengths, fluxes, flux_errs, offsets,
+                        bounds=self.fit_bounds, full_output=True,
+                        **batch_options)
+                perr = np.sqrt(np.diagonal(covariances, axis1=1, axis2=2))
+                temperatures[~converged] = np.nan
+                angular_radii[~converged] = np.nan
+                perr[~converged] = np.nan
+                self.fit_log['success'] = converged
+                self.fit_log['nfev'] = info['nit']
+                self.fit_log['message'][~converged] = 'did not converge'
+                self.fit_log['message'][np.diff(offsets) < 2] = \
+                    'fewer than 2 observations'
             else:
-                uv_corr, uv_corr_err = uv_correction_blackbody(
-                    temperature, temperature_err, angular_radius,
-                    angular_radius_err, shortest_wl)
-
-            fbol = fqbol + ir_corr + uv_corr
-            fbol_err = np.sqrt(
-                np.sum(x * x for x in [fqbol_err, ir_corr_err, uv_corr_err]))
-            lum = fbol * 4.0 * np.pi * self.distance_cm**2.0
-            lum_err = np.sqrt((4.0 * np.pi * self.distance_cm**2 * fbol_err)**2
-                              + (8.0 * np.pi * fbol * self.distance_cm *
-                                 self.distance_cm_err)**2)
-            phase = jd - self.parameter_table.cols.explosion_JD[0]
-            phase_err = self.parameter_table.cols.explosion_JD_err[0]
-            self.lc = np.append(
-                self.lc, [[jd, phase, phase_err, lum, lum_err]], axis=0)
-
-        self.lc = np.delete(self.lc, (0), axis=0)
-
-        self.write_lbol_plaintext(self.lc, 'direct')
-
-    def lqbol(self):
+                temperatures, angular_radii, perr, info = \
+                    bb_fit_parameters_sequential(
+                        wavelengths, fluxes, flux_errs, offsets,
+                        full_output=True, bounds=self.fit_bounds,
+                        max_nfev=self.fit_max_nfev)
+                for i, fit_info in enumerate(info):
+                    self.fit_log[i] = (jds[i], fit_info['success'],
+                                       fit_info['nfev'], fit_info['message'])
+            return list(zip(temperatures, perr[:, 0], angular_radii,
+                            perr[:, 1]))
+
+        fits = []
+        for i, (names, wavelengths, fluxes, flux_errs) in enumerate(epochs):
+            temperature, angular_radius, perr, info = bb_fit_parameters(
+                wavelengths, fluxes, flux_errs, full_output=True,
+                method=fit_method, bounds=self.fit_bounds,
+                max_nfev=self.fit_max_nfev)
+            self.fit_log[i] = (jds[i], info['success'], info['nfev'],
+                               info['message'])
+            fits.append((temperature, perr[0], angular_radius, perr[1]))
+        return fits
+
+    def lqbol(self, write=True):
         """Calculate the quasi-bolometric lightcurve using direct integration
         with trapezoidal integration of the fluxes
+
+        Args:
+            write (bool): Write the lightcurve to file.
         """
-        self.convert_magnitudes_to_fluxes()
-        self.deredden_fluxes()
-        self.get_lbol_epochs()
-        self.distance_cm, self.distance_cm_err = self.get_distance_cm()
-
-        self.qbol_lc = np.array([[0.0, 0.0, 0.0, 0.0, 0.0]])
-
-        for jd in self.lbol_epochs:
-            wavelengths = np.array([
-                x['wavelength'] for x in self.converted_obs if x['jd'] == jd
-            ])
-            fluxes = np.array(
-                [x['flux'] for x in self.converted_obs if x['jd'] == jd])
-            flux_errs = np.array([
-                x['uncertainty'] for x in self.converted_obs if x['jd'] == jd
-            ])
-            names = np.array(
-                [x['name'] for x in self.converted_obs if x['jd'] == jd])
-
-            sort_indices = np.argsort(wavelengths)
-            wavelengths = wavelengths[sort_indices]
-            fluxes = fluxes[sort_indices]
-            flux_errs = flux_errs[sort_indices]
-            names = names[sort_indices]
-
-            fqbol, fqbol_err = fqbol_trapezoidal(wavelengths, fluxes,
-                                                 flux_errs)
-
-            lqbol = fqbol * 4.0 * np.pi * self.distance_cm**2.0
-            lqbol_err = np.sqrt((4.0 * np.pi * self.distance_cm**2 * fqbol_err)
-                                **2 + (8.0 * np.pi * fqbol * self.distance_cm *
-                                       self.distance_cm_err)**2)
-            phase = jd - self.parameter_table.cols.explosion_JD[0]
-            phase_err = self.parameter_table.cols.explosion_JD_err[0]
-            # Quick and dirty fix for IR-only nights (don't want those in qbol calc)
-            if min(wavelengths) < 10000.0:
-                self.qbol_lc = np.append(
-                    self.qbol_lc, [[jd, phase, phase_err, lqbol, lqbol_err]],
-                    axis=0)
-        self.qbol_lc = np.delete(self.qbol_lc, (0), axis=0)
-        self.write_lbol_plaintext(self.qbol_lc, 'qbol')
-
-    def lbol_bc_bh09(self, filter1, filter2):
+        lbol_epochs = self.lbol_jds
+        distance_cm, distance_cm_err = self.distance
+
+        names, wavelengths, fluxes, flux_errs, offsets = \
+            self.gather_epoch_observations(lbol_epochs)
+        fqbol, fqbol_err = fqbol_batch(wavelengths, fluxes, flux_errs,
+                                       offsets)
+        lqbol = fqbol * 4.0 * np.pi * distance_cm**2.0
+        lqbol_err = np.sqrt((4.0 * np.pi * distance_cm**2 * fqbol_err)
+                            **2 + (8.0 * np.pi * fqbol * distance_cm *
+                                   distance_cm_err)**2)
+
+        # Quick and dirty fix for IR-only nights (don't want those in qbol calc)
+        optical = wavelengths[offsets[:-1]] < 10000.0
+        self.qbol_lc = self.make_lightcurve(lbol_epochs[optical],
+                                            lqbol[optical],
+                                            lqbol_err[optical])
+        if write:
+            self.write_lbol_plaintext(self.qbol_lc, 'qbol')
+
+    def lbol_bc_bh09(self, filter1, filter2, write=True):
         """Calculate the bolometric lightcurve using the bolometric corrections
         found in Bersten & Hamuy 2009 (2009ApJ...701..200B). These require
-        specifying a color, taken to be filter1 - filter2"""
-        self.get_magnitudes()
-        self.deredden_UBVRI_magnitudes()
-        self.get_bc_epochs(filter1, filter2)
-        self.distance_cm, self.distance_cm_err = self.get_distance_cm()
-
-        self.bc_lc = np.array([[0.0, 0.0, 0.0, 0.0, 0.0]])
-
-        for i in range(len(self.bc_epochs)):
-            jd = self.bc_epochs[i]
-            color = self.get_bc_color(jd, filter1, filter2)
-            color_err = self.get_bc_color_uncertainty(jd, filter1, filter2)
-            v_mag = np.array([
-                x['magnitude'] for x in self.photometry
-                if x['jd'] == jd and x['name'] == 'V'
-            ])
-            v_mag_err = np.array([
-                x['uncertainty'] for x in self.photometry
-                if x['jd'] == jd and x['name'] == 'V'
-            ])
-            lbol_bc, lbol_bc_err = calc_Lbol(
-                color, color_err, filter1 + "minus" + filter2, v_mag,
-                v_mag_err, self.distance_cm, self.distance_cm_err)
-            phase = jd - self.parameter_table.cols.explosion_JD[0]
-            phase_err = self.parameter_table.cols.explosion_JD_err[0]
-            self.bc_lc = np.append(
-                self.bc_lc, [[jd, phase, phase_err, lbol_bc, lbol_bc_err]],
-                axis=0)
-
-        self.bc_lc = np.delete(self.bc_lc, (0), axis=0)
-        self.write_lbol_plaintext(self.bc_lc, 'bc_' + filter1 + '-' + filter2)
+        specifying a color, taken to be filter1 - filter2
+
+        Args:
+            filter1 (str): First filter of the color
+            filter2 (str): Second filter of the color
+            write (bool): Write the lightcurve to file.
+        """
+        self.lbol_bc_bh09_multi([(filter1, filter2)], write=write)
+        self.bc_lc = self.bc_lcs[filter1 + "minus" + filter2]
+
+    def lbol_bc_bh09_multi(self, colors=(('B', 'V'), ('V', 'I'), ('B', 'I')),
+                           write=True):
+        """Calculate the bolometric lightcurves for several colors at once,
+        using the bolometric corrections of Bersten & Hamuy 2009
+        (2009ApJ...701..200B).
+
+        The magnitudes are loaded and dereddened once, and a single lookup
+        table of the magnitudes in every filter on every epoch is shared by
+        all colors.
+
+        Args:
+            colors (list): (filter1, filter2) pairs of the colors to use,
+                each taken to be filter1 - filter2. See the table in the class
+                docstring for the acceptable combinations.
+            write (bool): Also write the lightcurve of each color to its own
+                file, as :meth:`lbol_bc_bh09` does.
+
+        Returns:
+            array: Structured array with one row per epoch on which at least
+            one of the colors was observed, holding the `jd`, `phase` and
+            `phase_err`, and a column group per color (named as in
+            "BminusV") with the `lbol` and `lbol_err` of that color. The
+            luminosities are NaN where the color was not observed or is
+            outside the range of validity of its polynomial fit.
+
+            The lightcurve of each color, in the format written to file, is
+            also kept in the `bc_lcs` dict, keyed by the color name.
+        """
+        # Loads and dereddens the magnitudes, unless they are cached already
+        self.magnitudes
+        distance_cm, distance_cm_err = self.distance
+
+        color_types = [filter1 + "minus" + filter2
+                       for filter1, filter2 in colors]
+        filters = sorted(set(['V'] + [f for color in colors for f in color]))
+        jds, magnitudes, uncertainties = self.get_magnitude_table(filters)
+        column = dict((f, k) for k, f in enumerate(filters))
+
+        explosion_JD = self.parameters['explosion_JD'][0]
+        explosion_JD_err = self.parameters['explosion_JD_err'][0]
+        v_mags = magnitudes[:, column['V']]
+        v_mag_errs = uncertainties[:, column['V']]
+
+        results = {}
+        observed = np.zeros(len(jds), dtype=bool)
+        self.bc_lcs = {}
+        for (filter1, filter2), color_type in zip(colors, color_types):
+            k1 = column[filter1]
+            k2 = column[filter2]
+            color_observed = ~np.isnan(magnitudes[:, k1]) & \
+                ~np.isnan(magnitudes[:, k2])
+            color = magnitudes[:, k1] - magnitudes[:, k2]
+            color_err = np.sqrt(uncertainties[:, k1]**2 +
+                                uncertainties[:, k2]**2)
+            lbol_bc, lbol_bc_err = calc_Lbol_array(
+                color[color_observed], color_err[color_observed], color_type,
+                v_mags[color_observed], v_mag_errs[color_observed],
+                distance_cm, distance_cm_err)
+
+            results[color_type] = (color_observed, lbol_bc, lbol_bc_err)
+            observed |= color_observed
+
+            # Colors outside the range of the fit are written out as -999
+            bc_epochs = jds[color_observed]
+            self.bc_lcs[color_type] = self.make_lightcurve(
+                bc_epochs, lbol_bc.filled(-999), lbol_bc_err.filled(-999))
+            if write:
+                self.write_lbol_plaintext(self.bc_lcs[color_type],
+                                          'bc_' + filter1 + '-' + filter2)
+
+        dtype = [('jd', '>f8'), ('phase', '>f8'), ('phase_err', '>f8')] + [
+            (color_type, [('lbol', '>f8'), ('lbol_err', '>f8')])
+            for color_type in color_types
+        ]
+        table = np.zeros(np.count_nonzero(observed), dtype=dtype)
+        table['jd'] = jds[observed]
+        table['phase'] = table['jd'] - explosion_JD
+        table['phase_err'] = explosion_JD_err
+        for color_type, (color_observed, lbol_bc, lbol_bc_err) in \
+                results.items():
+            rows = color_observed[observed]
+            table[color_type]['lbol'] = np.nan
+            table[color_type]['lbol_err'] = np.nan
+            table[color_type]['lbol'][rows] = lbol_bc.filled(np.nan)
+            table[color_type]['lbol_err'][rows] = lbol_bc_err.filled(np.nan)
+
+        self.bc_table = table
+        return table
+
+    def get_magnitude_table(self, filters):
+        """Arrange the photometry as a table of epochs by filters
+
+        Args:
+            filters (list): String designations of the filters to include
+
+        Returns:
+            tuple: 3-tuple
+
+            * (array) the unique Julian Dates of the photometry
+            * (array) magnitudes, of shape ``(len(jds), len(filters))``
+            * (array) uncertainties in the magnitudes, of the same shape
+
+            Epochs without an observation in a filter hold NaN. If a filter
+            was observed more than once on an epoch, the first observation
+            is used.
+        """
+        jds = self.phot_index.jds
+        magnitudes = np.full((len(jds), len(filters)), np.nan)
+        uncertainties = np.full((len(jds), len(filters)), np.nan)
+
+        for k, filter_name in enumerate(filters):
+            rows = self.phot_index.filter_rows(filter_name)
+            observed = rows >= 0
+            magnitudes[observed, k] = \
+                self.photometry['magnitude'][rows[observed]]
+            uncertainties[observed, k] = \
+                self.photometry['uncertainty'][rows[observed]]
+
+        return jds, magnitudes, uncertainties
 
     def get_bc_color(self, jd, filter1, filter2):
         """Make an array of `filter1` - `filter2` on each of the bc_epochs
@@ -248,16 +762,8 @@ class SN(object):
             float: Magnitude of filter 1 minus the magnitude of filter 2.
         """
 
-        f1_mag = np.array([
-            x['magnitude'] for x in self.photometry
-            if x['jd'] == jd and x['name'] == filter1
-        ])
-        f2_mag = np.array([
-            x['magnitude'] for x in self.photometry
-            if x['jd'] == jd and x['name'] == filter2
-        ])
-
-        return f1_mag - f2_mag
+        return self.get_bc_color_values(jd, filter1, filter2, 'magnitude',
+                                        np.subtract)
 
     def get_bc_color_uncertainty(self, jd, filter1, filter2):
         """Make an array of :math:`\\sqrt{(\\delta \\text{filter1})^2 - (\\delta
@@ -273,44 +779,89 @@ class SN(object):
             filter 1 and filter 2.
         """
 
-        f1_err = np.array([
-            x['uncertainty'] for x in self.photometry
-            if x['jd'] == jd and x['name'] == filter1
-        ])
-        f2_err = np.array([
-            x['uncertainty'] for x in self.photometry
-            if x['jd'] == jd and x['name'] == filter2
-        ])
+        return self.get_bc_color_values(
+            jd, filter1, filter2, 'uncertainty',
+            lambda f1_err, f2_err: np.sqrt(f1_err**2 + f2_err**2))
 
-        return np.sqrt(f1_err**2 + f2_err**2)
+    def get_bc_color_values(self, jd, filter1, filter2, field, combine):
+        """Combine a field of the photometry in two filters on one epoch
+
+        Args:
+            jd (float): Julian Date of the observation
+            filter1 (str): String designation for filter 1
+            filter2 (str): String designation for filter 2
+            field (str): Field of `photometry` to combine
+            combine (function): Function of the values in filter 1 and
+                filter 2
+
+        Returns:
+            array: The combined value, as a one element array, or an empty
+            array if either filter was not observed on the epoch.
+        """
+        epoch = self.phot_index.find(jd)[()]
+        if epoch < 0:
+            return np.array([])
+        row1 = self.phot_index.filter_rows(filter1)[epoch]
+        row2 = self.phot_index.filter_rows(filter2)[epoch]
+        if row1 < 0 or row2 < 0:
+            return np.array([])
+
+        return combine(self.photometry[field][[row1]],
+                       self.photometry[field][[row2]])
 
     def get_magnitudes(self):
         """Build a numpy array of [`jd`, `name`, `magnitude`, `uncertainty`]
         from the data contained within the HDF5 file.
         """
-        dtype = [('jd', '>f8'), ('name', 'S1'), ('magnitude', '>f8'), (
+        self._stages.pop('magnitudes', None)
+        dtype = [('jd', '>f8'), ('name', 'U1'), ('magnitude', '>f8'), (
             'uncertainty', '>f8')]
-        self.photometry = np.array([(0.0, '0.0', 0.0, 0.0)], dtype=dtype)
+        phot, filt = self.read_photometry()
+
+        self.photometry = np.zeros(len(phot), dtype=dtype)
+        self.photometry['jd'] = phot['jd']
+        self.photometry['name'] = filt['name']
+        self.photometry['magnitude'] = phot['magnitude']
+        self.photometry['uncertainty'] = phot['uncertainty']
+        self.phot_index = EpochIndex(self.photometry['jd'],
+                                     self.photometry['name'])
 
-        for obs in self.phot_table.iterrows():
-            filterid = obs['filter_id']
-            for filt in self.filter_table.where('(filter_id == filterid)'):
-                self.photometry = np.append(
-                    self.photometry,
-                    np.array(
-                        [(obs['jd'], filt['name'], obs['magnitude'],
-                          obs['uncertainty'])],
-                        dtype=dtype))
+    def read_photometry(self):
+        """Read the photometry of the SN and join it to the filters
 
-        self.photometry = np.delete(self.photometry, (0), axis=0)
+        The ``phot`` table is read in one go and every observation is matched
+        to its filter by `filter_id` with :func:`lookup_filters`.
+        Observations in filters that are not in the ``filters`` table are
+        left out.
+
+        On an SN made from a snapshot, the photometry comes from `phot`
+        instead. The result is cached until `phot_table`, `phot` or
+        `filters` are assigned, so that the magnitudes and the fluxes share a
+        single read.
+
+        Returns:
+            tuple: 2-tuple of structured arrays of the same length, holding
+            the rows of the ``phot`` table and the matching rows of the
+            ``filters`` table.
+        """
+        return self._memoize('photometry', self._photometry_key(),
+                             self._read_photometry)
+
+    def _read_photometry(self):
+        phot = self.phot if self.phot is not None else self.phot_table.read()
+        filter_index = lookup_filters(phot['filter_id'], self.filters)
+        found = filter_index >= 0
+
+        return phot[found], self.filters[filter_index[found]]
 
     def deredden_UBVRI_magnitudes(self):
         """Apply the corrections from CCM89 (1989ApJ...345..245C), Table 3 to
         the observed photometric magnitudes.
 
         IMPORTANT: This will only deredden the UBVRI magnitudes at the moment"""
-        self.Av_gal = self.parameter_table.cols.Av_gal[0]
-        self.Av_host = self.parameter_table.cols.Av_host[0]
+        self._stages.pop('magnitudes', None)
+        self.Av_gal = self.parameters['Av_gal'][0]
+        self.Av_host = self.parameters['Av_host'][0]
         self.Av_tot = self.Av_gal + self.Av_host
 
         ccm89_corr = {'U': 1.569, 'B': 1.337, 'V': 1.0, 'R': 0.751, 'I': 0.479}
@@ -322,19 +873,8 @@ class SN(object):
 
     def get_bc_epochs(self, filter1, filter2):
         """Get epochs for which observations of both filter1 and filter2 exist"""
-        self.bc_epochs = np.array([])
-
-        for jd_unique in np.unique(self.photometry['jd']):
-            has_filter1 = False
-            has_filter2 = False
-            for obs in self.photometry:
-                if obs['jd'] == jd_unique:
-                    if obs['name'] == filter1:
-                        has_filter1 = True
-                    elif obs['name'] == filter2:
-                        has_filter2 = True
-            if has_filter1 and has_filter2:
-                self.bc_epochs = np.append(self.bc_epochs, jd_unique)
+        observed = self.phot_index.has_filters([filter1, filter2])
+        self.bc_epochs = self.phot_index.jds[observed]
 
     def get_distance_cm(self):
         """Get the distance to the supernova in centimeters from the HDF5 file.
@@ -346,9 +886,8 @@ class SN(object):
             * (float) uncertainty in the distance to the supernova in cm
         """
         mpc_to_cm = 3.08567758E24
-        distance_cm = self.parameter_table.cols.distance_Mpc[0] * mpc_to_cm
-        distance_cm_err = self.parameter_table.cols.distance_Mpc_err[
-            0] * mpc_to_cm
+        distance_cm = self.parameters['distance_Mpc'][0] * mpc_to_cm
+        distance_cm_err = self.parameters['distance_Mpc_err'][0] * mpc_to_cm
         return distance_cm, distance_cm_err
 
     def get_lbol_epochs(self):
@@ -357,60 +896,87 @@ class SN(object):
         The minimum number of filters needed to calculate a luminosity is set in
         the __init__ mehod.
         """
-        self.lbol_epochs = np.array([])
-
-        for jd_unique in np.unique(self.converted_obs['jd']):
-            num_obs = 0
-            for obs in self.converted_obs:
-                if obs['jd'] == jd_unique:
-                    num_obs += 1
-            if num_obs >= self.min_num_obs:
-                self.lbol_epochs = np.append(self.lbol_epochs, jd_unique)
+        self._stages.pop('lbol_epochs', None)
+        enough = self.obs_index.counts >= self.min_num_obs
+        self.lbol_epochs = self.obs_index.jds[enough]
 
     def convert_magnitudes_to_fluxes(self):
         """Perform the magnitude to flux conversion.
 
         Creates an array of [`jd`, `name`, `wavelength`, `flux`, `uncertainty`]
         """
-        dtype = [('jd', '>f8'), ('name', 'S1'), ('wavelength', '>f8'),
+        self._stages.pop('fluxes', None)
+        self._stages.pop('lbol_epochs', None)
+        dtype = [('jd', '>f8'), ('name', 'U1'), ('wavelength', '>f8'),
                  ('flux', '>f8'), ('uncertainty', '>f8')]
-        self.converted_obs = np.array(
-            [(0.0, '0.0', 0.0, 0.0, 0.0)], dtype=dtype)
-
-        for obs in self.phot_table.iterrows():
-            filterid = obs['filter_id']
-            for filt in self.filter_table.where('(filter_id == filterid)'):
-                flux, flux_err = mag2flux(obs['magnitude'], obs['uncertainty'],
-                                          filt['eff_wl'],
-                                          filt['flux_zeropoint'])
-                if 909.09 <= filt['eff_wl'] <= 33333.33:
-                    self.converted_obs = np.append(
-                        self.converted_obs,
-                        np.array(
-                            [(obs['jd'], filt['name'], filt['eff_wl'], flux,
-                              flux_err)],
-                            dtype=dtype))
-
-        self.converted_obs = np.delete(self.converted_obs, (0), axis=0)
+
+        phot, filt = self.read_photometry()
+        flux, flux_err = mag2flux_array(phot['magnitude'], phot['uncertainty'],
+                                        filt['flux_zeropoint'])
+        keep = (909.09 <= filt['eff_wl']) & (filt['eff_wl'] <= 33333.33)
+
+        self.converted_obs = np.zeros(np.count_nonzero(keep), dtype=dtype)
+        self.converted_obs['jd'] = phot['jd'][keep]
+        self.converted_obs['name'] = filt['name'][keep]
+        self.converted_obs['wavelength'] = filt['eff_wl'][keep]
+        self.converted_obs['flux'] = flux[keep]
+        self.converted_obs['uncertainty'] = flux_err[keep]
+        self.obs_index = EpochIndex(self.converted_obs['jd'],
+                                    self.converted_obs['name'],
+                                    self.converted_obs['wavelength'])
 
     def deredden_fluxes(self):
         """Deredden the observed fluxes using the ccm89 model
 
         The dereddening procedure is handled by the ``apply`` method
-        from the extinction package.
+        from the extinction package, with :math:`A_\\lambda` from
+        :func:`ccm89_extinction` and :math:`R_V` from the `Rv` attribute.
         """
-        self.Av_gal = self.parameter_table.cols.Av_gal[0]
-        self.Av_host = self.parameter_table.cols.Av_host[0]
+        self._stages.pop('fluxes', None)
+        self._stages.pop('lbol_epochs', None)
+        self.Av_gal = self.parameters['Av_gal'][0]
+        self.Av_host = self.parameters['Av_host'][0]
         self.Av_tot = self.Av_gal + self.Av_host
 
-        for obs in self.converted_obs:
-            wavelength = np.array([float(obs['wavelength'])])
-            obs_flux = np.array([float(obs['flux'])])
-            A_lam = extinction.ccm89(wavelength, self.Av_tot, 3.1)
-            obs['flux'] = extinction.apply(-A_lam, obs_flux)
+        A_lam = ccm89_extinction(self.converted_obs['wavelength'],
+                                 self.Av_tot, self.Rv)
+        self.converted_obs['flux'] = extinction.apply(
+            -A_lam, np.asarray(self.converted_obs['flux'], dtype=float))
+
+    def make_lightcurve(self, jds, lbol, lbol_err, dtype=lightcurve_dtype):
+        """Build a lightcurve as a structured array
+
+        The array is allocated at its final size and filled column by column.
+
+        Args:
+            jds (array): Julian Dates of the epochs
+            lbol (array): Bolometric luminosities in erg/s
+            lbol_err (array): Uncertainties in the luminosities in erg/s
+            dtype (list): Dtype of the lightcurve. It must have the fields of
+                `lightcurve_dtype`; any others are left as zeros to be filled
+                by the caller.
+
+        Returns:
+            array: Structured array with the `jd`, `phase`, `phase_err`,
+            `lbol` and `lbol_err` of each epoch.
+        """
+        lightcurve = np.zeros(len(jds), dtype=dtype)
+        lightcurve['jd'] = jds
+        lightcurve['phase'] = jds - self.parameters['explosion_JD'][0]
+        lightcurve['phase_err'] = self.parameters['explosion_JD_err'][0]
+        lightcurve['lbol'] = lbol
+        lightcurve['lbol_err'] = lbol_err
+        return lightcurve
 
     def write_lbol_plaintext(self, lightcurve, suffix):
-        """Write the lightcurve to a file. Append suffix to filename"""
+        """Write the lightcurve to a file. Append suffix to filename
+
+        Only the `jd`, `phase`, `phase_err`, `lbol` and `lbol_err` columns
+        of a structured lightcurve are written.
+        """
+        if lightcurve.dtype.names is not None:
+            lightcurve = np.column_stack(
+                [lightcurve[field] for field, _ in lightcurve_dtype])
         filename = "lbol_" + self.name + "_" + suffix + ".dat"
         lc_file = open(filename, 'wb')
         np.savetxt(
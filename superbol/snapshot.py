@@ -0,0 +1,66 @@
+import numpy as np
+
+
+def _read_only(array):
+    """Read-only copy of `array`, or a view of it if it is already read-only"""
+    array = np.asarray(array)
+    if array.flags.writeable:
+        array = array.copy()
+    else:
+        array = array.view()
+    array.flags.writeable = False
+    return array
+
+
+class SNSnapshot(object):
+    """Immutable copy of the data on one supernova, held in plain arrays
+
+    A snapshot holds everything :class:`~superbol.sn.SN` reads from the
+    HDF5 database, without any open file or PyTables node. It is cheap to
+    pickle, so it can be sent to worker processes or stored in a cache, and
+    an SN that runs every lightcurve method on it is made with
+    :meth:`SN.from_snapshot <superbol.sn.SN.from_snapshot>`.
+
+    Writeable arrays are copied, so changing them afterwards does not change
+    the snapshot. Arrays that are already read-only, such as those of a
+    :class:`~superbol.store.PhotometryStore`, are only viewed.
+
+    Args:
+        name (str): Name of the supernova
+        photometry (array): Rows of the ``phot`` table of the supernova
+        filters (array): Rows of the ``filters`` table
+        parameters (array): Rows of the ``parameters`` table of the
+            supernova (the first is used)
+
+    Attributes:
+        name (str): Name of the supernova
+        photometry (array): Read-only photometry
+        filters (array): Read-only filters
+        parameters (array): Read-only parameters
+
+    Examples:
+        >>> snapshot = SN('sn1998a').snapshot()
+        >>> SN.from_snapshot(pickle.loads(pickle.dumps(snapshot))).lqbol()
+    """
+
+    __slots__ = ('name', 'photometry', 'filters', 'parameters')
+
+    def __init__(self, name, photometry, filters, parameters):
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'photometry', _read_only(photometry))
+        object.__setattr__(self, 'filters', _read_only(filters))
+        object.__setattr__(self, 'parameters', _read_only(parameters))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SNSnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("SNSnapshot is immutable")
+
+    def __reduce__(self):
+        return (SNSnapshot, (self.name, self.photometry, self.filters,
+                             self.parameters))
+
+    def __repr__(self):
+        return "SNSnapshot(%r, %d observations)" % (self.name,
+                                                     len(self.photometry))
@@ -0,0 +1,238 @@
+import os
+import shutil
+import tempfile
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from superbol.datafile import SharedFile
+from superbol.snapshot import SNSnapshot
+
+photometry_fields = ('filter_id', 'jd', 'magnitude', 'uncertainty')
+
+_attached = {}
+_stores = {}
+
+
+def _attach_untracked(name):
+    """Attach to a shared memory block without registering it with the
+    resource tracker, as ``track=False`` does from Python 3.13 on
+
+    Before Python 3.13 attaching always registers the block, so the tracker
+    would unlink it, or warn that it leaked, when the attaching process
+    exits. Unregistering it afterwards is no help: worker processes share
+    the tracker of the process that created the block, and that would drop
+    the creator's own registration, so the tracker reports an error when
+    the creator unlinks the block.
+    """
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _attach_shared_memory(name):
+    """Attach to a shared memory block, once per process"""
+    if name not in _attached:
+        try:
+            # Only the process that created the block may unlink it
+            block = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            block = _attach_untracked(name)
+        _attached[name] = block
+    return _attached[name]
+
+
+def _attach_store(names, offsets, spec, backend):
+    """Unpickle a store, attaching to its data once per process"""
+    key = spec['photometry'][0]
+    if key not in _stores:
+        _stores[key] = PhotometryStore(names, offsets, spec, backend)
+    return _stores[key]
+
+
+class PhotometryStore(object):
+    """Photometry, filters and parameters of many supernovae, loaded once
+    and shared by worker processes without copying
+
+    The tables of every supernova are concatenated into three arrays held
+    in ``multiprocessing.shared_memory`` blocks, or in memory-mapped
+    ``.npy`` files. The photometry of each supernova is found through an
+    index of offsets. Pickling a store only sends the names of the blocks
+    and the index, and unpickling it in another process attaches to the
+    same memory, so workers neither reread the HDF5 file nor copy the data.
+
+    Create a store with :meth:`create`, and close it once the workers are
+    done; closing the store that created the data also frees it.
+
+    Examples:
+        >>> with PhotometryStore.create() as store:
+        ...     sn = SN.from_snapshot(store.snapshot('sn1998a'))
+
+    Attributes:
+        names (list): Names of the supernovae in the store
+        offsets (array): Index of the first observation of each supernova
+            in `photometry`, followed by the total number of observations
+        photometry (array): Photometry of every supernova, with the columns
+            of `photometry_fields`
+        filters (array): Rows of the ``filters`` table
+        parameters (array): Row of the ``parameters`` table of each
+            supernova
+        backend (str): ``'shared_memory'`` or ``'memmap'``
+    """
+
+    def __init__(self, names, offsets, spec, backend, owner=False):
+        self.names = list(names)
+        self.offsets = np.asarray(offsets)
+        self.backend = backend
+        self._spec = spec
+        self._owner = owner
+        self._positions = dict((name, i) for i, name in enumerate(names))
+        self._blocks = []
+        self._closed = False
+
+        for key in ('photometry', 'filters', 'parameters'):
+            location, dtype, shape = spec[key]
+            if backend == 'shared_memory':
+                block = _attach_shared_memory(location)
+                self._blocks.append(block)
+                array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            else:
+                array = np.load(location, mmap_mode='r')
+            array = array.view()
+            array.flags.writeable = False
+            setattr(self, key, array)
+
+    @classmethod
+    def create(cls, names=None, path=None, backend='shared_memory',
+               directory=None):
+        """Read the supernovae from the HDF5 database into a new store
+
+        Args:
+            names (list): Names of the supernovae, every one under ``/sn`` by
+                default. Those without both a ``phot`` and a ``parameters``
+                table are left out.
+            path (str): Path to the HDF5 database, the one shipped with
+                superbol by default
+            backend (str): ``'shared_memory'`` (default) to hold the data in
+                ``multiprocessing.shared_memory`` blocks, or ``'memmap'`` to
+                write it to ``.npy`` files that are memory-mapped
+            directory (str): Where the ``'memmap'`` backend writes its files,
+                a new temporary directory by default
+
+        Returns:
+            PhotometryStore: The store.
+
+        Raises:
+            ValueError: The backend is unknown.
+        """
+        if backend not in ('shared_memory', 'memmap'):
+            raise ValueError("unknown backend: " + str(backend))
+
+        with SharedFile.acquire(path) as h5file:
+            if names is None:
+                names = sorted(h5file.get_node('/sn')._v_children)
+            stored = []
+            photometry = []
+            parameters = []
+            for name in names:
+                try:
+                    phot = h5file.get_node('/sn/' + name, 'phot').read()
+                    params = h5file.get_node('/sn/' + name,
+                                             'parameters').read()
+                except Exception:
+                    continue
+                stored.append(name)
+                photometry.append(phot[list(photometry_fields)])
+                parameters.append(params[:1])
+            filters = h5file.get_node('/filters').read()
+
+        counts = [len(phot) for phot in photometry]
+        dtype = [(field, '<i8' if field == 'filter_id' else '<f8')
+                 for field in photometry_fields]
+        photometry = np.concatenate(
+            [phot.astype(dtype) for phot in photometry] +
+            [np.zeros(0, dtype=dtype)])
+        if parameters:
+            parameters = np.concatenate(parameters)
+        else:
+            parameters = np.zeros(0, dtype=[('distance_Mpc', '<f8')])
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(int)
+
+        arrays = (('photometry', photometry), ('filters', filters),
+                  ('parameters', parameters))
+        spec = {}
+        if backend == 'memmap':
+            spec['temporary'] = directory is None
+            if directory is None:
+                directory = tempfile.mkdtemp(prefix='superbol_')
+            spec['directory'] = directory
+            for key, array in arrays:
+                location = os.path.join(directory, key + '.npy')
+                np.save(location, array)
+                spec[key] = (location, array.dtype, array.shape)
+        else:
+            for key, array in arrays:
+                block = shared_memory.SharedMemory(
+                    create=True, size=max(array.nbytes, 1))
+                np.ndarray(array.shape, dtype=array.dtype,
+                           buffer=block.buf)[...] = array
+                _attached[block.name] = block
+                spec[key] = (block.name, array.dtype, array.shape)
+
+        return cls(stored, offsets, spec, backend, owner=True)
+
+    def snapshot(self, name):
+        """Snapshot of one supernova, viewing the shared arrays
+
+        Args:
+            name (str): Name of the supernova
+
+        Returns:
+            SNSnapshot: The data on the supernova, without a copy of its
+            photometry.
+
+        Raises:
+            KeyError: The supernova is not in the store.
+        """
+        if name not in self._positions:
+            raise KeyError(name + " is not in the photometry store")
+        i = self._positions[name]
+        return SNSnapshot(name,
+                          self.photometry[self.offsets[i]:self.offsets[i + 1]],
+                          self.filters, self.parameters[i:i + 1])
+
+    def close(self):
+        """Detach from the data, and free it if this store created it"""
+        if self._closed:
+            return
+        self._closed = True
+        for key in ('photometry', 'filters', 'parameters'):
+            setattr(self, key, None)
+        _stores.pop(self._spec['photometry'][0], None)
+        for block in self._blocks:
+            _attached.pop(block.name, None)
+            try:
+                block.close()
+            except BufferError:
+                # Snapshots still view the block; it is unmapped when they
+                # are garbage collected
+                pass
+            if self._owner:
+                block.unlink()
+        self._blocks = []
+        if self._owner and self.backend == 'memmap' and \
+                self._spec.get('temporary'):
+            shutil.rmtree(self._spec['directory'], ignore_errors=True)
+
+    def __reduce__(self):
+        return (_attach_store, (self.names, self.offsets, self._spec,
+                                self.backend))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,4 +1,5 @@
 import unittest
+import numpy as np
 from .context import superbol
 import superbol.bc_polynomial as bc_polynomial
 import superbol.constants as constants
@@ -183,5 +184,42 @@ class TestBolometricCorrection(unittest.TestCase):
                                                          self.color_type)[0]
         self.assertEqual(expected, result)
 
+class TestEvaluatePolynomial(unittest.TestCase):
+
+    def test_evaluate_polynomial_matches_calculate_polynomial(self):
+        coefficients = [1.2, 4.6, 2.5, 633.3, 34.3]
+        variables = np.array([-1.5, 0.0, 0.5, 3.2])
+        expected = [bc_polynomial.calculate_polynomial(coefficients, x)
+                    for x in variables]
+        result = bc_polynomial.evaluate_polynomial(coefficients, variables)
+        np.testing.assert_allclose(result, expected, rtol=1e-14)
+
+class TestBolometricCorrectionArray(unittest.TestCase):
+
+    def setUp(self):
+        self.color_values = np.array([0.422, 128.54, -0.1, np.nan, 1.6])
+        self.color_errs = np.array([0.04, 0.04, 0.02, 0.04, 0.1])
+        self.color_type = "BminusV"
+
+    def test_bolometric_correction_array_matches_scalar(self):
+        result, uncertainty = bc_polynomial.calc_bolometric_correction_array(
+            self.color_values, self.color_errs, self.color_type)
+        for i in [0, 2, 4]:
+            expected = bc_polynomial.calc_bolometric_correction(
+                self.color_values[i], self.color_errs[i], self.color_type)
+            self.assertAlmostEqual(expected[0], result[i], places=12)
+            self.assertAlmostEqual(expected[1], uncertainty[i], places=12)
+
+    def test_bolometric_correction_array_is_nan_outside_range(self):
+        result, uncertainty = bc_polynomial.calc_bolometric_correction_array(
+            self.color_values, self.color_errs, self.color_type)
+        np.testing.assert_array_equal(np.isnan(result),
+                                      [False, True, False, True, False])
+        np.testing.assert_array_equal(np.isnan(uncertainty), np.isnan(result))
+
+    def test_bc_table_bad_argument(self):
+        self.assertRaises(TypeError, bc_polynomial.bc_table, 2)
+        self.assertRaises(ValueError, bc_polynomial.bc_table, 'Hello')
+
 if __name__ == '__main__':
     unittest.main()
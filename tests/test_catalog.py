@@ -0,0 +1,87 @@
+import unittest
+import multiprocessing
+import os
+from unittest import mock
+import numpy as np
+import tables as tb
+from .context import superbol
+import superbol.catalog
+from superbol.catalog import list_supernovae, process_supernova, run_catalog
+
+
+class TestCatalog(unittest.TestCase):
+
+    def test_list_supernovae_filters_by_pattern(self):
+        names = list_supernovae(pattern='sn199*')
+        self.assertTrue(len(names) > 0)
+        self.assertEqual(names, sorted(names))
+        for name in names:
+            self.assertTrue(name.startswith('sn199'))
+
+    def test_run_catalog_matches_single_supernova(self):
+        expected = process_supernova('sn1998a', methods=('qbol',))
+        result, failures = run_catalog(['sn1998a'], methods=('qbol',),
+                                       max_workers=1)
+        self.assertEqual(failures, {})
+        np.testing.assert_array_equal(result, expected)
+
+    def test_run_catalog_with_shared_store(self):
+        expected, _ = run_catalog(['sn1998a'], methods=('qbol',),
+                                  max_workers=1)
+        result, failures = run_catalog(['sn1998a'], methods=('qbol',),
+                                       max_workers=1, store='shared_memory')
+        self.assertEqual(failures, {})
+        np.testing.assert_array_equal(result, expected)
+
+    def test_run_catalog_isolates_failures(self):
+        result, failures = run_catalog(['sn0000a', 'sn1998a'],
+                                       methods=('qbol',), max_workers=2)
+        self.assertEqual(list(failures), ['sn0000a'])
+        self.assertTrue(len(result) > 0)
+        np.testing.assert_array_equal(np.unique(result['name']), ['sn1998a'])
+
+    def test_run_catalog_opens_database_once_per_worker(self):
+        context = multiprocessing.get_context('fork')
+        opened = context.Value('i', 0)
+        open_file = tb.open_file
+
+        def counting_open_file(*args, **kwargs):
+            with opened.get_lock():
+                opened.value += 1
+            return open_file(*args, **kwargs)
+
+        # Forked workers inherit the patched open_file
+        with mock.patch.object(tb, 'open_file', counting_open_file):
+            result, failures = run_catalog(
+                ['sn1998a', 'sn2000cb', 'sn2009e'], methods=('qbol',),
+                max_workers=1, mp_context=context)
+        self.assertEqual(failures, {})
+        self.assertEqual(opened.value, 1)
+
+    def test_run_catalog_survives_dead_worker(self):
+        names = ['sn1998a', 'mystery', 'sn2000cb', 'sn2009e', 'sn2006v']
+
+        def dying_process_supernova(name, **kwargs):
+            if name == 'mystery':
+                os._exit(1)
+            return process_supernova(name, **kwargs)
+
+        # Forked workers inherit the patched process_supernova
+        with mock.patch.object(superbol.catalog, 'process_supernova',
+                               dying_process_supernova):
+            for max_workers in (1, 2):
+                result, failures = run_catalog(
+                    names, methods=('qbol',), max_workers=max_workers,
+                    mp_context=multiprocessing.get_context('fork'))
+                self.assertEqual(list(failures), ['mystery'])
+                self.assertIn('BrokenProcessPool', failures['mystery'])
+                np.testing.assert_array_equal(
+                    np.unique(result['name']),
+                    sorted(set(names) - set(['mystery'])))
+
+    def test_run_catalog_rejects_unknown_method(self):
+        self.assertRaises(ValueError, run_catalog, ['sn1998a'],
+                          methods=('nope',))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from unittest import mock
+import tables as tb
+from .context import superbol
+from superbol.datafile import SharedFile
+from superbol.sn import SN
+
+
+class TestSharedFile(unittest.TestCase):
+
+    def test_acquire_shares_open_file(self):
+        first = SharedFile.acquire()
+        second = SharedFile.acquire()
+        try:
+            self.assertIs(first, second)
+            self.assertEqual(first.refcount, 2)
+        finally:
+            second.release()
+            first.release()
+
+    def test_release_closes_file_after_last_reference(self):
+        first = SharedFile.acquire()
+        second = SharedFile.acquire()
+        second.release()
+        self.assertTrue(first.h5file.isopen)
+        first.release()
+        self.assertFalse(first.h5file.isopen)
+
+    def test_context_manager_releases_reference(self):
+        with SharedFile.acquire() as data:
+            h5file = data.h5file
+            self.assertTrue(h5file.isopen)
+        self.assertFalse(h5file.isopen)
+
+    def test_get_node_is_cached(self):
+        with SharedFile.acquire() as data:
+            self.assertIs(data.get_node('/filters'),
+                          data.get_node('/filters'))
+
+    def test_get_node_raises_for_missing_node(self):
+        with SharedFile.acquire() as data:
+            self.assertRaises(tb.NoSuchNodeError, data.get_node, '/sn',
+                              'sn0000a')
+
+    def test_keep_open_holds_file_between_sns(self):
+        SharedFile.close_all()
+        self.addCleanup(SharedFile.close_all)
+        with mock.patch.object(tb, 'open_file', wraps=tb.open_file) as opened:
+            SharedFile.keep_open()
+            SharedFile.keep_open()
+            for name in ['sn1998a', 'sn2000cb', 'sn2009e']:
+                with SN(name) as sn:
+                    sn.lqbol(write=False)
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(SharedFile.acquire().refcount, 2)
+
+    def test_close_all_closes_kept_file(self):
+        data = SharedFile.keep_open()
+        SharedFile.close_all()
+        self.assertFalse(data.h5file.isopen)
+        data.release()
+        with SharedFile.acquire() as reopened:
+            self.assertIsNot(reopened, data)
+            self.assertTrue(reopened.h5file.isopen)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+from .context import superbol
+from superbol.epochs import EpochIndex
+
+
+class TestEpochIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.jds = np.array([2.0, 1.0, 2.0, 1.0, 2.0, 3.0])
+        self.names = np.array(['V', 'B', 'B', 'V', 'V', 'I'])
+        self.wavelengths = np.array([5450.0, 4380.0, 4380.0, 5450.0, 5450.0,
+                                     7980.0])
+        self.index = EpochIndex(self.jds, self.names, self.wavelengths)
+
+    def test_epochs_are_unique_jds(self):
+        np.testing.assert_array_equal(self.index.jds, [1.0, 2.0, 3.0])
+        np.testing.assert_array_equal(self.index.counts, [2, 3, 1])
+
+    def test_epoch_rows_are_sorted_by_wavelength(self):
+        np.testing.assert_array_equal(self.index.rows(1), [2, 0, 4])
+
+    def test_filter_rows_use_first_observation(self):
+        np.testing.assert_array_equal(self.index.filter_rows('V'),
+                                      [3, 0, -1])
+        np.testing.assert_array_equal(self.index.filter_rows('R'),
+                                      [-1, -1, -1])
+
+    def test_has_filters(self):
+        np.testing.assert_array_equal(self.index.has_filters(['B', 'V']),
+                                      [True, True, False])
+        np.testing.assert_array_equal(self.index.num_filters(), [2, 2, 1])
+
+    def test_find(self):
+        np.testing.assert_array_equal(self.index.find([3.0, 1.5, 1.0]),
+                                      [2, -1, 0])
+
+    def test_gather(self):
+        rows, offsets = self.index.gather([2, -1, 1],
+                                          keep=self.names != 'B')
+        np.testing.assert_array_equal(rows, [5, 0, 4])
+        np.testing.assert_array_equal(offsets, [0, 1, 1, 3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -60,6 +60,30 @@ class TestFbol(unittest.TestCase):
                                                    6.0e-13)
         self.assertEqual(expected, result)
 
+    def test_integrate_fqbol_batch_matches_single_epochs(self):
+        wavelengths = self.eff_wl_array.value
+        fluxes = self.flux_array.value
+        flux_uncertainties = self.flux_uncertainties.value
+        epochs = [(wavelengths, fluxes, flux_uncertainties),
+                  (wavelengths[1:3], 2.0 * fluxes[1:3], flux_uncertainties[1:3]),
+                  (wavelengths[::2], fluxes[::2], 0.5 * flux_uncertainties[::2])]
+        offsets = np.cumsum([0] + [len(epoch[0]) for epoch in epochs])
+
+        result, uncertainty = integrate_fqbol_batch(np.concatenate([epoch[0] for epoch in epochs]),
+                                                    np.concatenate([epoch[1] for epoch in epochs]),
+                                                    np.concatenate([epoch[2] for epoch in epochs]),
+                                                    offsets)
+
+        for i, epoch in enumerate(epochs):
+            expected, expected_uncertainty = integrate_fqbol(*epoch)
+            self.assertAlmostEqual(expected / result[i], 1.0, places=14)
+            self.assertAlmostEqual(expected_uncertainty / uncertainty[i], 1.0, places=14)
+
+    def test_integrate_fqbol_batch_raises_on_short_epoch(self):
+        with self.assertRaises(ValueError):
+            integrate_fqbol_batch(self.eff_wl_array.value, self.flux_array.value,
+                                  self.flux_uncertainties.value, [0, 4, 5])
+
 class TestBlackbodyIntegration(unittest.TestCase):
         
     def setUp(self):
@@ -81,6 +105,19 @@ class TestBlackbodyIntegration(unittest.TestCase):
                                self.best_fit_angular_radius_err,
                                self.longest_wavelength)
         self.assertAlmostEqual(expected[0], result[0])
+
+    def test_ir_correction_table(self):
+        expected = ir_correction(self.best_fit_temperature,
+                                 self.best_fit_temperature_err,
+                                 self.best_fit_angular_radius,
+                                 self.best_fit_angular_radius_err,
+                                 self.longest_wavelength)
+        result = ir_correction(self.best_fit_temperature,
+                               self.best_fit_temperature_err,
+                               self.best_fit_angular_radius,
+                               self.best_fit_angular_radius_err,
+                               self.longest_wavelength, method='table')
+        np.testing.assert_allclose(result, expected, rtol=1e-9)
     
     def test_uv_correction_blackbody(self):
         expected = integrate.quad(bb_flux_nounits, 0, self.shortest_wavelength,
@@ -92,3 +129,38 @@ class TestBlackbodyIntegration(unittest.TestCase):
                                          self.best_fit_angular_radius_err,
                                          self.shortest_wavelength)
         self.assertAlmostEqual(expected[0], result[0])
+
+    def test_uv_correction_linear_accepts_arrays(self):
+        result, uncertainty = uv_correction_linear(np.array([3000., 3660.]),
+                                                   np.array([1.0e-12, 5.87565760e-12]),
+                                                   np.array([1.0e-13, 6.0e-13]))
+        expected = [uv_correction_linear(3000., 1.0e-12, 1.0e-13),
+                    uv_correction_linear(3660., 5.87565760e-12, 6.0e-13)]
+        np.testing.assert_array_equal(result, [expected[0][0], expected[1][0]])
+        np.testing.assert_array_equal(uncertainty, [expected[0][1], expected[1][1]])
+
+    def test_unobserved_flux_corrections_match_scalar_corrections(self):
+        temperatures = np.array([self.best_fit_temperature, 9000.])
+        T_errs = np.array([self.best_fit_temperature_err, 100.])
+        angular_radii = np.array([self.best_fit_angular_radius, 2.0e-10])
+        rad_errs = np.array([self.best_fit_angular_radius_err, 1.0e-11])
+        shortest_wls = np.array([self.shortest_wavelength, 4380.])
+        longest_wls = np.array([self.longest_wavelength, 12000.])
+        shortest_fluxes = np.array([5.87565760e-12, 1.0e-11])
+        shortest_flux_errs = np.array([6.0e-13, 1.0e-12])
+        linear_uv = np.array([True, False])
+
+        result = unobserved_flux_corrections(temperatures, T_errs, angular_radii, rad_errs,
+                                             shortest_wls, longest_wls, shortest_fluxes,
+                                             shortest_flux_errs, linear_uv)
+
+        for i in range(2):
+            expected_ir = ir_correction(temperatures[i], T_errs[i], angular_radii[i],
+                                        rad_errs[i], longest_wls[i])
+            if linear_uv[i]:
+                expected_uv = uv_correction_linear(shortest_wls[i], shortest_fluxes[i],
+                                                   shortest_flux_errs[i])
+            else:
+                expected_uv = uv_correction_blackbody(temperatures[i], T_errs[i], angular_radii[i],
+                                                      rad_errs[i], shortest_wls[i])
+            np.testing.assert_allclose([r[i] for r in result], expected_ir + expected_uv, rtol=1e-14)
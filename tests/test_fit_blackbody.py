@@ -42,6 +42,35 @@ class TestFitBlackbody(unittest.TestCase):
 
         self.assertEqual(expected.value, result)
 
+    def test_bb_flux_nounits_broadcasts_over_grid(self):
+        temperatures = np.array([5000., 10000., 13000.])
+        angular_radii = np.array([0.2e-10, 1.0e-10, 3.0e-10])
+        result = bb_flux_nounits(self.eff_wl_array.value[:, np.newaxis],
+                                 temperatures, angular_radii)
+
+        self.assertEqual(result.shape, (5, 3))
+        expected = bb_flux(self.eff_wl_array[3], temperatures[1],
+                           angular_radii[1])
+        self.assertEqual(expected.value, result[3, 1])
+
+    def test_bb_flux_integrated_and_derivatives_matches_separate_calls(self):
+        wavelengths = np.array([3660., 7980., 21900.])
+        flux, dflux_dT, dflux_dtheta = bb_flux_integrated_and_derivatives(
+            wavelengths, 9000., 3.0e-10, angular_radius_derivative=True)
+
+        np.testing.assert_allclose(
+            flux, bb_flux_integrated(wavelengths, 9000., 3.0e-10), rtol=1e-14)
+        np.testing.assert_allclose(
+            dflux_dT, dbb_flux_integrated_dT(wavelengths, 9000., 3.0e-10),
+            rtol=1e-12)
+        np.testing.assert_allclose(dflux_dtheta, 2 * flux / 3.0e-10,
+                                   rtol=1e-14)
+
+    def test_bb_flux_integrated_and_derivatives_default_returns_pair(self):
+        result = bb_flux_integrated_and_derivatives(5000., 9000., 3.0e-10)
+
+        self.assertEqual(len(result), 2)
+
     def test_bb_fit_parameters_returns_expected_parameters(self):
         popt, pcov = curve_fit(bb_flux_nounits, self.eff_wl_array.value, self.flux_array.value,
                                p0=[5000, 1.0e-10], sigma=self.flux_uncertainties.value,
@@ -51,5 +80,216 @@ class TestFitBlackbody(unittest.TestCase):
         expected_perr = np.sqrt(np.diag(pcov))
         result_temp, result_radius, result_perr = bb_fit_parameters(self.eff_wl_array.value,
                                                        self.flux_array.value, self.flux_uncertainties.value)
-        self.assertEqual((expected_temp, expected_radius, expected_perr[0], expected_perr[1]), 
-                         (result_temp, result_radius, result_perr[0], result_perr[1]))
+        # bb_fit_parameters uses the analytic Jacobian, so it only agrees
+        # with the finite-difference fit to within the fit tolerance.
+        np.testing.assert_allclose((result_temp, result_radius, result_perr[0], result_perr[1]),
+                                   (expected_temp, expected_radius, expected_perr[0], expected_perr[1]),
+                                   rtol=1e-6)
+
+    def test_bb_flux_jacobian_matches_finite_differences(self):
+        temperature = 9000.
+        angular_radius = 3.0e-10
+        wavelengths = self.eff_wl_array.value
+        dT = 1.0e-6 * temperature
+        dtheta = 1.0e-6 * angular_radius
+        expected_dT = (bb_flux_nounits(wavelengths, temperature + dT, angular_radius) -
+                       bb_flux_nounits(wavelengths, temperature - dT, angular_radius)) / (2 * dT)
+        expected_dtheta = (bb_flux_nounits(wavelengths, temperature, angular_radius + dtheta) -
+                           bb_flux_nounits(wavelengths, temperature, angular_radius - dtheta)) / (2 * dtheta)
+        result = bb_flux_jacobian(wavelengths, temperature, angular_radius)
+
+        self.assertEqual(result.shape, (5, 2))
+        np.testing.assert_allclose(result[:, 0], expected_dT, rtol=1e-7)
+        np.testing.assert_allclose(result[:, 1], expected_dtheta, rtol=1e-7)
+
+    def test_bb_fit_parameters_reports_evaluation_counts(self):
+        calls = [0]
+
+        def counted_model(wavelength, temperature, angular_radius):
+            calls[0] += 1
+            return bb_flux_nounits(wavelength, temperature, angular_radius)
+
+        curve_fit(counted_model, self.eff_wl_array.value, self.flux_array.value,
+                  p0=[5000, 1.0e-10], sigma=self.flux_uncertainties.value, absolute_sigma=True)
+        info = bb_fit_parameters(self.eff_wl_array.value, self.flux_array.value,
+                                 self.flux_uncertainties.value, full_output=True)[3]
+
+        self.assertGreater(info['njev'], 0)
+        self.assertLess(info['nfev'], calls[0])
+
+    def test_bb_fit_parameters_varpro_matches_curve_fit(self):
+        expected = bb_fit_parameters(self.eff_wl_array.value, self.flux_array.value,
+                                     self.flux_uncertainties.value)
+        result = bb_fit_parameters(self.eff_wl_array.value, self.flux_array.value,
+                                   self.flux_uncertainties.value, method='varpro')
+
+        np.testing.assert_allclose((result[0], result[1], result[2][0], result[2][1]),
+                                   (expected[0], expected[1], expected[2][0], expected[2][1]),
+                                   rtol=1e-5)
+
+    def test_bb_fit_parameters_varpro_recovers_exact_blackbody(self):
+        wavelengths = self.eff_wl_array.value
+        fluxes = bb_flux_nounits(wavelengths, 13000., 2.0e-10)
+        result_temp, result_radius, result_perr = bb_fit_parameters(wavelengths, fluxes, 0.01 * fluxes,
+                                                                    method='varpro')
+
+        np.testing.assert_allclose((result_temp, result_radius), (13000., 2.0e-10), rtol=1e-9)
+
+    def test_bb_fit_parameters_raises_on_unknown_method(self):
+        with self.assertRaises(ValueError):
+            bb_fit_parameters(self.eff_wl_array.value, self.flux_array.value,
+                              self.flux_uncertainties.value, method='simplex')
+
+    def test_bb_fit_parameters_batch_matches_single_epoch_fits(self):
+        wavelengths = self.eff_wl_array.value
+        exact_fluxes = bb_flux_nounits(wavelengths[1:], 9000., 3.0e-10)
+        all_wavelengths = np.concatenate([wavelengths, wavelengths[1:]])
+        all_fluxes = np.concatenate([self.flux_array.value, exact_fluxes])
+        all_errs = np.concatenate([self.flux_uncertainties.value, 0.05 * exact_fluxes])
+        offsets = [0, 5, 9]
+
+        temperatures, angular_radii, covariances, chi2, converged = bb_fit_parameters_batch(
+            all_wavelengths, all_fluxes, all_errs, offsets)
+
+        self.assertEqual(covariances.shape, (2, 2, 2))
+        self.assertTrue(converged.all())
+        for i in range(2):
+            epoch = slice(offsets[i], offsets[i + 1])
+            expected_temp, expected_radius, expected_perr = bb_fit_parameters(
+                all_wavelengths[epoch], all_fluxes[epoch], all_errs[epoch], method='varpro')
+            expected_chi2 = np.sum(((bb_flux_nounits(all_wavelengths[epoch], expected_temp, expected_radius)
+                                     - all_fluxes[epoch]) / all_errs[epoch])**2)
+            np.testing.assert_allclose((temperatures[i], angular_radii[i]), (expected_temp, expected_radius),
+                                       rtol=1e-8)
+            np.testing.assert_allclose(np.sqrt(np.diag(covariances[i])), expected_perr, rtol=1e-6)
+            np.testing.assert_allclose(chi2[i], expected_chi2, rtol=1e-8, atol=1e-12)
+
+    def test_bb_fit_parameters_batch_flags_short_epochs(self):
+        wavelengths = self.eff_wl_array.value
+        fluxes = self.flux_array.value
+        uncertainties = self.flux_uncertainties.value
+        expected = bb_fit_parameters_batch(wavelengths, fluxes, uncertainties, [0, 5])
+        result = bb_fit_parameters_batch(np.concatenate([wavelengths[:1], wavelengths]),
+                                         np.concatenate([fluxes[:1], fluxes]),
+                                         np.concatenate([uncertainties[:1], uncertainties]), [0, 1, 1, 6],
+                                         full_output=True)
+
+        np.testing.assert_array_equal(result[4], [False, False, True])
+        np.testing.assert_array_equal(result[5]['nit'][:2], [0, 0])
+        self.assertTrue(np.all(np.isnan(result[0][:2])))
+        np.testing.assert_allclose((result[0][2], result[1][2]), (expected[0][0], expected[1][0]))
+
+    def test_bb_fit_parameters_flags_single_observation(self):
+        for method in ('curve_fit', 'varpro'):
+            result_temp, result_radius, result_perr, info = bb_fit_parameters(
+                self.eff_wl_array.value[:1], self.flux_array.value[:1], self.flux_uncertainties.value[:1],
+                full_output=True, method=method)
+
+            self.assertFalse(info['success'])
+            self.assertEqual(info['message'], 'fewer than 2 observations')
+            self.assertTrue(np.isnan(result_temp))
+
+    def test_wien_initial_guess_estimates_hot_blackbody(self):
+        wavelengths = np.array([2000., 2500., 3000., 6000.])
+        fluxes = bb_flux_nounits(wavelengths, 5000., 2.0e-10)
+        result = wien_initial_guess(wavelengths, fluxes)
+
+        np.testing.assert_allclose(result, (5000., 2.0e-10), rtol=0.05)
+
+    def test_wien_initial_guess_rejects_flux_rising_to_the_blue(self):
+        wavelengths = self.eff_wl_array.value
+        self.assertIsNone(wien_initial_guess(wavelengths, wavelengths**-6))
+
+    def test_bb_fit_parameters_warm_start_saves_evaluations(self):
+        cold = bb_fit_parameters(self.eff_wl_array.value, self.flux_array.value,
+                                 self.flux_uncertainties.value, full_output=True)
+        warm = bb_fit_parameters(self.eff_wl_array.value, self.flux_array.value,
+                                 self.flux_uncertainties.value, full_output=True, p0=cold[:2])
+
+        np.testing.assert_allclose(warm[:2], cold[:2], rtol=1e-5)
+        self.assertLess(warm[3]['nfev'], cold[3]['nfev'])
+
+    def test_bb_fit_parameters_sequential_matches_independent_fits(self):
+        wavelengths = self.eff_wl_array.value
+        temperatures = [9000., 8500., 8000.]
+        all_fluxes = np.concatenate([bb_flux_nounits(wavelengths, T, 3.0e-10) for T in temperatures])
+        all_wavelengths = np.tile(wavelengths, 3)
+        offsets = [0, 5, 10, 15]
+
+        result_temps, result_radii, result_perr, info = bb_fit_parameters_sequential(
+            all_wavelengths, all_fluxes, 0.05 * all_fluxes, offsets, full_output=True)
+
+        self.assertEqual(result_perr.shape, (3, 2))
+        self.assertEqual([fit['p0'] for fit in info], ['wien', 'previous', 'previous'])
+        np.testing.assert_allclose(result_temps, temperatures, rtol=1e-6)
+        np.testing.assert_allclose(np.abs(result_radii), 3.0e-10, rtol=1e-6)
+
+    def test_bb_fit_parameters_flags_exhausted_budget(self):
+        result_temp, result_radius, result_perr, info = bb_fit_parameters(
+            self.eff_wl_array.value, self.flux_array.value, self.flux_uncertainties.value,
+            full_output=True, max_nfev=3)
+
+        self.assertFalse(info['success'])
+        self.assertEqual(info['nfev'], 3)
+        self.assertTrue(info['message'])
+        self.assertTrue(np.isnan(result_temp))
+        self.assertTrue(np.all(np.isnan(result_perr)))
+
+    def test_bb_fit_parameters_raises_on_exhausted_budget_without_full_output(self):
+        with self.assertRaises(RuntimeError):
+            bb_fit_parameters(self.eff_wl_array.value, self.flux_array.value,
+                              self.flux_uncertainties.value, max_nfev=3)
+
+    def test_bb_fit_parameters_flags_unusable_data(self):
+        nan_fluxes = np.array([1.0, np.nan, 1.0, 1.0, 1.0]) * self.flux_array.value
+        zero_uncertainties = np.zeros(5)
+        for method in ('curve_fit', 'varpro'):
+            for fluxes, uncertainties in ((nan_fluxes, self.flux_uncertainties.value),
+                                          (self.flux_array.value, zero_uncertainties)):
+                result_temp, result_radius, result_perr, info = bb_fit_parameters(
+                    self.eff_wl_array.value, fluxes, uncertainties, full_output=True, method=method)
+
+                self.assertFalse(info['success'])
+                self.assertTrue(np.isnan(result_temp))
+
+    def test_bb_fit_parameters_raises_on_unusable_data_without_full_output(self):
+        nan_fluxes = np.array([1.0, np.nan, 1.0, 1.0, 1.0]) * self.flux_array.value
+        with self.assertRaises(ValueError):
+            bb_fit_parameters(self.eff_wl_array.value, nan_fluxes, self.flux_uncertainties.value)
+
+    def test_bb_fit_parameters_varpro_flags_zero_fluxes(self):
+        result_temp, result_radius, result_perr, info = bb_fit_parameters(
+            self.eff_wl_array.value, np.zeros(5), self.flux_uncertainties.value, full_output=True,
+            method='varpro')
+
+        self.assertFalse(info['success'])
+        self.assertTrue(np.all(np.isnan(result_perr)))
+
+    def test_bb_fit_parameters_respects_temperature_bound(self):
+        bounds = ([1000., 0.], [3000., 1.])
+        for method in ('curve_fit', 'varpro'):
+            result_temp, result_radius, result_perr, info = bb_fit_parameters(
+                self.eff_wl_array.value, self.flux_array.value, self.flux_uncertainties.value,
+                full_output=True, method=method, bounds=bounds)
+
+            self.assertTrue(info['success'])
+            np.testing.assert_allclose((result_temp, result_radius), (3000., 1.58472059e-08), rtol=1e-7)
+
+    def test_bb_fit_parameters_batch_flags_bad_epoch(self):
+        wavelengths = self.eff_wl_array.value
+        fluxes = self.flux_array.value
+        bad_fluxes = np.array([1.0, np.nan, 1.0, 1.0, 1.0]) * fluxes
+        result = bb_fit_parameters_batch(np.tile(wavelengths, 2), np.concatenate([fluxes, bad_fluxes]),
+                                         np.tile(self.flux_uncertainties.value, 2), [0, 5, 10],
+                                         max_iterations=30, full_output=True)
+
+        np.testing.assert_array_equal(result[4], [True, False])
+        self.assertEqual(result[5]['nit'][1], 30)
+
+    def test_bb_fit_parameters_batch_respects_bounds(self):
+        result = bb_fit_parameters_batch(self.eff_wl_array.value, self.flux_array.value,
+                                         self.flux_uncertainties.value, [0, 5],
+                                         bounds=([1000., 0.], [3000., 1.]))
+
+        self.assertTrue(result[4][0])
+        np.testing.assert_allclose((result[0][0], result[1][0]), (3000., 1.58472059e-08), rtol=1e-7)
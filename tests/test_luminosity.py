@@ -4,6 +4,7 @@ from superbol.bc_polynomial import calc_bolometric_correction as bc
 import superbol.luminosity as luminosity
 import superbol.constants as constants
 import math
+import numpy as np
 
 
 class TestLogLbol(unittest.TestCase):
@@ -128,5 +129,52 @@ class TestLogLbol(unittest.TestCase):
                                           self.distance_err)[1]
         self.assertEqual(expected, result)
 
+class TestLbolArray(unittest.TestCase):
+
+    def setUp(self):
+        self.color_values = np.array([0.5, 123.0, 1.2])
+        self.color_errs = np.array([0.04, 0.04, 0.05])
+        self.color_type = "BminusV"
+        self.v_magnitudes = np.array([16.59, 16.7, 17.1])
+        self.v_magnitude_errs = np.array([0.02, 0.02, 0.03])
+        self.distance = 1.54E23
+        self.distance_err = 0.308E23
+
+    def test_Fbol_array_matches_scalar(self):
+        result, uncertainty = luminosity.calc_Fbol_array(
+            self.color_values, self.color_errs, self.color_type,
+            self.v_magnitudes, self.v_magnitude_errs)
+        for i in [0, 2]:
+            expected = luminosity.calc_Fbol(
+                self.color_values[i], self.color_errs[i], self.color_type,
+                self.v_magnitudes[i], self.v_magnitude_errs[i])
+            self.assertAlmostEqual(expected[0] / result[i], 1.0, places=14)
+            self.assertAlmostEqual(expected[1] / uncertainty[i], 1.0,
+                                   places=14)
+
+    def test_Lbol_array_matches_scalar(self):
+        result, uncertainty = luminosity.calc_Lbol_array(
+            self.color_values, self.color_errs, self.color_type,
+            self.v_magnitudes, self.v_magnitude_errs, self.distance,
+            self.distance_err)
+        for i in [0, 2]:
+            expected = luminosity.calc_Lbol(
+                self.color_values[i], self.color_errs[i], self.color_type,
+                self.v_magnitudes[i], self.v_magnitude_errs[i],
+                self.distance, self.distance_err)
+            self.assertAlmostEqual(expected[0] / result[i], 1.0, places=14)
+            self.assertAlmostEqual(expected[1] / uncertainty[i], 1.0,
+                                   places=14)
+
+    def test_Lbol_array_masks_bad_colors(self):
+        result, uncertainty = luminosity.calc_Lbol_array(
+            self.color_values, self.color_errs, self.color_type,
+            self.v_magnitudes, self.v_magnitude_errs, self.distance,
+            self.distance_err)
+        np.testing.assert_array_equal(np.ma.getmaskarray(result),
+                                      [False, True, False])
+        np.testing.assert_array_equal(np.ma.getmaskarray(uncertainty),
+                                      [False, True, False])
+
 if __name__ == '__main__':
     unittest.main()
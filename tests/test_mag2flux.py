@@ -43,3 +43,42 @@ class TestMag2Flux(unittest.TestCase):
                                                               self.flux_at_zero_mag)
         
         self.assertEqual(expected.value, result_flux)
+
+
+class TestMag2FluxBatch(unittest.TestCase):
+
+    def setUp(self):
+        dtype = [('eff_wl', '<f8'), ('filter_id', '<i8'),
+                 ('flux_zeropoint', '<f8'), ('name', 'S16')]
+        self.filters = np.array([(5450.0, 2, 3.631E-9, b'V'),
+                                 (4380.0, 1, 6.320E-9, b'B'),
+                                 (7980.0, 3, 1.126E-9, b'I')], dtype=dtype)
+        self.magnitudes = np.array([8.8, 9.1, 8.5, 9.3])
+        self.uncertainties = np.array([0.02, 0.03, 0.02, 0.05])
+        self.filter_ids = np.array([2, 1, 3, 2])
+
+    def test_mag2flux_batch_matches_scalar(self):
+        flux, flux_err, index = mag2flux_batch(self.magnitudes,
+                                               self.uncertainties,
+                                               self.filter_ids, self.filters)
+        for i, filter_id in enumerate(self.filter_ids):
+            filt = self.filters[self.filters['filter_id'] == filter_id][0]
+            expected = mag2flux(self.magnitudes[i], self.uncertainties[i],
+                                filt['eff_wl'], filt['flux_zeropoint'])
+            self.assertAlmostEqual(expected[0] / flux[i], 1.0, places=14)
+            self.assertAlmostEqual(expected[1] / flux_err[i], 1.0, places=14)
+        np.testing.assert_array_equal(self.filters['filter_id'][index],
+                                      self.filter_ids)
+
+    def test_mag2flux_batch_flags_unknown_filters(self):
+        filter_ids = np.array([2, 7, 3, 0])
+        flux, flux_err, index = mag2flux_batch(self.magnitudes,
+                                               self.uncertainties,
+                                               filter_ids, self.filters)
+        np.testing.assert_array_equal(index, [0, -1, 2, -1])
+        np.testing.assert_array_equal(np.isnan(flux),
+                                      [False, True, False, True])
+
+    def test_lookup_filters_returns_filter_rows(self):
+        result = lookup_filters(np.array([3, 1, 2, 3]), self.filters)
+        np.testing.assert_array_equal(result, [2, 1, 0, 2])
@@ -1,9 +1,14 @@
 import unittest
 import numpy as np
+import scipy.integrate as integrate
 from astropy import constants as const
 from astropy import units as u
 from .context import superbol
-from superbol.planck import planck_function, planck_integral
+from superbol.planck import (planck_function, planck_function_nounits,
+                             planck_integral, planck_integral_nounits,
+                             d_planck_integral_dT,
+                             d_planck_integral_dT_nounits,
+                             planck_integral_and_derivative_nounits, C1, C2)
 
 class TestPlanckFunctionExtrema(unittest.TestCase):
 
@@ -117,3 +122,161 @@ class TestPlanckFunctionExtrema(unittest.TestCase):
         pdiff = abs(expected - result.value) / np.mean([expected, result.value])
         
         self.assertFalse(pdiff > 0.01)
+
+class TestPlanckFunctionNoUnits(unittest.TestCase):
+
+    def setUp(self):
+        self.wavelengths = np.array([3660., 4380., 5450., 6410., 7980.])
+        self.temperatures = np.array([2500., 5000., 10000.])
+
+    def test_matches_planck_function(self):
+        expected = planck_function(5000 * u.Angstrom, 5000 * u.K)
+        result = planck_function_nounits(5000., 5000.)
+
+        self.assertAlmostEqual(expected.value / result, 1.0, places=14)
+
+    def test_accepts_quantities(self):
+        expected = planck_function_nounits(5000., 5000.)
+        result = planck_function_nounits(0.5 * u.micron, 5000 * u.K)
+
+        self.assertAlmostEqual(expected / result, 1.0, places=14)
+
+    def test_broadcasts_over_wavelength_temperature_grid(self):
+        result = planck_function_nounits(self.wavelengths[:, np.newaxis],
+                                         self.temperatures[np.newaxis, :])
+
+        self.assertEqual(result.shape, (5, 3))
+        for i, wavelength in enumerate(self.wavelengths):
+            for j, temperature in enumerate(self.temperatures):
+                expected = planck_function(wavelength, temperature).value
+                self.assertAlmostEqual(expected / result[i, j], 1.0,
+                                       places=14)
+
+class TestPlanckIntegralBatched(unittest.TestCase):
+
+    def setUp(self):
+        self.wavelengths = np.array([3660., 7980., 21900., 100000.])
+        self.temperatures = np.array([2500., 5000., 10000.])
+
+    def test_batched_integral_matches_scalar_integral(self):
+        result = planck_integral_nounits(self.wavelengths[:, np.newaxis],
+                                         self.temperatures[np.newaxis, :])
+
+        self.assertEqual(result.shape, (4, 3))
+        for i, wavelength in enumerate(self.wavelengths):
+            for j, temperature in enumerate(self.temperatures):
+                expected = planck_integral(wavelength, temperature).value
+                self.assertAlmostEqual(expected / result[i, j], 1.0,
+                                       places=12)
+
+    def test_batched_derivative_matches_finite_difference(self):
+        wavelengths = self.wavelengths[:3]
+        temperatures = np.array([4000., 6000., 9000.])
+        dT = 1.0e-5 * temperatures
+        expected = (planck_integral_nounits(wavelengths, temperatures + dT) -
+                    planck_integral_nounits(wavelengths, temperatures - dT)) \
+                   / (2 * dT)
+        result = d_planck_integral_dT_nounits(wavelengths, temperatures)
+
+        np.testing.assert_allclose(result, expected, rtol=1.0e-5)
+
+    def test_quantity_derivative_wraps_batched_derivative(self):
+        expected = d_planck_integral_dT_nounits(3800., 5000.)
+        result = d_planck_integral_dT(3800 * u.AA, 5000 * u.K)
+
+        self.assertEqual(result.unit, u.erg / (u.s * u.cm**2 * u.K * u.sr))
+        self.assertEqual(expected, result.value)
+
+class TestPlanckIntegralTable(unittest.TestCase):
+
+    def setUp(self):
+        self.temperature = 5000.
+        self.x = np.array([1.0e-3, 0.1, 0.7, 1.0, 3.3, 12.0, 19.99, 20.0,
+                           45.0])
+        self.wavelengths = C2 / (self.x * self.temperature)
+
+    def dimensionless_integral(self, x):
+        return integrate.quad(lambda t: t**3 * np.exp(-t) / -np.expm1(-t), x, np.inf,
+                              epsabs=0, epsrel=1e-13)[0]
+
+    def test_table_integral_within_documented_error(self):
+        expected = np.array([self.dimensionless_integral(x) for x in self.x])
+        result = planck_integral_nounits(self.wavelengths, self.temperature,
+                                         method='table') \
+                 / (C1 * self.temperature**4 / C2**4)
+
+        np.testing.assert_allclose(result, expected, rtol=1e-10)
+
+    def test_table_derivative_within_documented_error(self):
+        F = np.array([self.dimensionless_integral(x) for x in self.x])
+        expected = 4 * F + self.x**4 / np.expm1(self.x)
+        result = d_planck_integral_dT_nounits(
+            self.wavelengths, self.temperature, method='table') \
+                 / (C1 * self.temperature**3 / C2**4)
+
+        np.testing.assert_allclose(result, expected, rtol=1e-10)
+
+    def test_table_agrees_with_series_for_uv_cutoff(self):
+        expected = planck_integral(3800, 5000)
+        result = planck_integral(3800, 5000, method='table')
+
+        self.assertAlmostEqual(expected.value / result.value, 1.0, places=10)
+
+    def test_unknown_method_raises(self):
+        self.assertRaises(ValueError, planck_integral_and_derivative_nounits,
+                          3800., 5000., method='quadrature')
+
+class TestPlanckIntegralAdaptive(unittest.TestCase):
+
+    def setUp(self):
+        self.temperature = 5000.
+        self.x = np.array([1.0e-4, 0.05, 0.5, 0.99, 1.0, 2.5, 12.0, 60.0])
+        self.wavelengths = C2 / (self.x * self.temperature)
+        self.expected = np.array([
+            integrate.quad(lambda t: t**3 * np.exp(-t) / -np.expm1(-t), x, np.inf,
+                           epsabs=0, epsrel=1e-13)[0] for x in self.x])
+
+    def test_adaptive_integral_meets_tolerance(self):
+        for tol in [1.0e-6, 1.0e-10, 1.0e-13]:
+            result = planck_integral_nounits(self.wavelengths,
+                                             self.temperature, tol=tol) \
+                     / (C1 * self.temperature**4 / C2**4)
+            np.testing.assert_allclose(result, self.expected, rtol=tol)
+
+    def test_adaptive_derivative_meets_tolerance(self):
+        expected = 4 * self.expected + self.x**4 / np.expm1(self.x)
+        result = d_planck_integral_dT_nounits(
+            self.wavelengths, self.temperature, tol=1.0e-12) \
+                 / (C1 * self.temperature**3 / C2**4)
+
+        np.testing.assert_allclose(result, expected, rtol=1.0e-12)
+
+    def test_adaptive_series_uses_fewer_terms_at_loose_tolerance(self):
+        wavelength = C2 / (3.0 * self.temperature)
+        fixed_terms = planck_integral(wavelength, self.temperature,
+                                      full_output=True)[1]
+        adaptive_terms = planck_integral(wavelength, self.temperature,
+                                         tol=1.0e-6, full_output=True)[1]
+
+        self.assertEqual(fixed_terms, 7)
+        self.assertEqual(adaptive_terms, 5)
+
+    def test_adaptive_series_avoids_term_cap_at_long_wavelength(self):
+        fixed_terms = planck_integral(1.0e6, 5000., full_output=True)[1]
+        adaptive_terms = planck_integral(1.0e6, 5000., tol=1.0e-12,
+                                         full_output=True)[1]
+
+        self.assertEqual(fixed_terms, 511)
+        self.assertLess(adaptive_terms, 20)
+
+    def test_full_output_reports_terms_per_element(self):
+        integral, n_terms = planck_integral_nounits(
+            self.wavelengths, self.temperature, tol=1.0e-10,
+            full_output=True)
+
+        self.assertEqual(n_terms.shape, self.x.shape)
+        self.assertTrue(np.all(n_terms <= 25))
+
+    def test_non_positive_tolerance_raises(self):
+        self.assertRaises(ValueError, planck_integral_nounits, 3800., 5000.,
+                          tol=0.0)
@@ -0,0 +1,284 @@
+import unittest
+from unittest import mock
+import numpy as np
+import extinction
+import superbol.sn
+from .context import superbol
+from superbol.fit_blackbody import bb_fit_parameters
+from superbol.sn import (SN, ccm89_extinction, direct_lightcurve_dtype,
+                         lightcurve_dtype)
+from superbol.snapshot import SNSnapshot
+
+
+class TestSN(unittest.TestCase):
+
+    def setUp(self):
+        self.sn = SN('sn1998a')
+
+    def tearDown(self):
+        self.sn.close()
+
+    def test_lbol_direct_bh09_flags_epoch_with_nan_observation(self):
+        self.sn.lbol_direct_bh09(write=False)
+        expected = self.sn.lc
+        snapshot = self.sn.snapshot()
+        photometry = np.array(snapshot.photometry)
+        bad_jd = self.sn.lbol_jds[0]
+        photometry['magnitude'][np.flatnonzero(photometry['jd'] == bad_jd)[0]] = np.nan
+        bad_snapshot = SNSnapshot(snapshot.name, photometry, snapshot.filters,
+                                  snapshot.parameters)
+
+        for fit_method in ('curve_fit', 'varpro', 'batch', 'sequential'):
+            sn = SN.from_snapshot(bad_snapshot)
+            sn.lbol_direct_bh09(fit_method, write=False)
+            self.assertFalse(sn.fit_log['success'][0])
+            self.assertTrue(sn.fit_log['message'][0])
+            np.testing.assert_array_equal(sn.lc['jd'], expected['jd'][1:])
+
+    def test_lbol_direct_bh09_flags_epochs_with_one_observation(self):
+        self.sn.min_num_obs = 1
+        for fit_method in ('curve_fit', 'varpro', 'batch', 'sequential'):
+            self.sn.lbol_direct_bh09(fit_method, write=False)
+            short = self.sn.fit_log['message'] == 'fewer than 2 observations'
+            self.assertTrue(np.any(short))
+            self.assertFalse(np.any(self.sn.fit_log['success'][short]))
+            self.assertTrue(len(self.sn.lc) > 0)
+
+    def test_fit_blackbodies_limits_batch_iterations(self):
+        self.sn.fit_max_nfev = 1
+        self.sn.lbol_direct_bh09('batch', write=False)
+        np.testing.assert_array_equal(self.sn.fit_log['nfev'], 1)
+        self.assertFalse(np.any(self.sn.fit_log['success']))
+
+    def test_deredden_UBVRI_magnitudes_corrects_named_filters(self):
+        phot, filt = self.sn.read_photometry()
+        Av_tot = (self.sn.parameters['Av_gal'][0] +
+                  self.sn.parameters['Av_host'][0])
+        magnitudes = self.sn.magnitudes
+
+        B = magnitudes['name'] == 'B'
+        self.assertTrue(np.any(B))
+        np.testing.assert_allclose(magnitudes['magnitude'][B],
+                                   phot['magnitude'][filt['name'] == 'B'] -
+                                   1.337 * Av_tot)
+        self.assertTrue(np.all(magnitudes['magnitude'][B] <
+                               phot['magnitude'][filt['name'] == 'B']))
+
+
+class TestSNLightcurves(unittest.TestCase):
+
+    def setUp(self):
+        self.sn = SN('sn1998a')
+
+    def tearDown(self):
+        self.sn.close()
+
+    def test_lightcurve_dtypes(self):
+        self.sn.lqbol(write=False)
+        self.sn.lbol_direct_bh09(write=False)
+        self.assertEqual(self.sn.qbol_lc.dtype, np.dtype(lightcurve_dtype))
+        self.assertEqual(self.sn.lc.dtype, np.dtype(direct_lightcurve_dtype))
+        self.assertEqual(self.sn.lc.dtype.names,
+                         ('jd', 'phase', 'phase_err', 'lbol', 'lbol_err',
+                          'temperature', 'temperature_err', 'angular_radius',
+                          'angular_radius_err'))
+
+    def test_direct_lightcurve_holds_fit_parameters(self):
+        self.sn.lbol_direct_bh09(write=False)
+        epoch = self.sn.lc[1]
+        names, wavelengths, fluxes, flux_errs = \
+            self.sn.get_epoch_observations(epoch['jd'],
+                                           excluded_filters=['z'])
+        temperature, angular_radius, perr, info = bb_fit_parameters(
+            wavelengths, fluxes, flux_errs, full_output=True)
+
+        self.assertTrue(info['success'])
+        self.assertTrue(
+            self.sn.fit_log['success'][self.sn.fit_log['jd'] == epoch['jd']])
+        np.testing.assert_array_equal(
+            [epoch['temperature'], epoch['angular_radius'],
+             epoch['temperature_err'], epoch['angular_radius_err']],
+            [temperature, angular_radius, perr[0], perr[1]])
+        np.testing.assert_array_equal(
+            np.isin(self.sn.fit_log['jd'], self.sn.lc['jd']),
+            self.sn.fit_log['success'])
+
+
+class TestSNExtinction(unittest.TestCase):
+
+    def test_ccm89_extinction_matches_extinction_package(self):
+        wavelengths = np.array([4380., 3660., 4380., 12200., 5450.])
+        for Av, Rv in ((0.4, 3.1), (0.4, 2.5), (1.2, 2.5)):
+            expected = extinction.ccm89(wavelengths, Av, Rv)
+            # The second call comes from the cache
+            for _ in range(2):
+                np.testing.assert_allclose(
+                    ccm89_extinction(wavelengths, Av, Rv), expected,
+                    rtol=1e-14)
+        np.testing.assert_allclose(
+            ccm89_extinction(np.array([[4380., 7980.]]), 0.4, 2.5),
+            [extinction.ccm89(np.array([4380., 7980.]), 0.4, 2.5)],
+            rtol=1e-14)
+
+    def test_fluxes_are_dereddened_with_Rv(self):
+        with SN('sn1998a') as sn:
+            sn.convert_magnitudes_to_fluxes()
+            observed = sn.converted_obs.copy()
+            Av_tot = sn.parameters['Av_gal'][0] + sn.parameters['Av_host'][0]
+            default_fluxes = sn.fluxes.copy()
+        with SN('sn1998a', Rv=2.5) as sn:
+            fluxes = sn.fluxes
+
+        A_lam = extinction.ccm89(np.asarray(observed['wavelength'], float),
+                                 Av_tot, 2.5)
+        np.testing.assert_allclose(fluxes['flux'],
+                                   observed['flux'] * 10**(0.4 * A_lam),
+                                   rtol=1e-12)
+        self.assertTrue(np.all(fluxes['flux'] != default_fluxes['flux']))
+
+
+class TestSNBolometricCorrections(unittest.TestCase):
+
+    def setUp(self):
+        self.colors = (('B', 'V'), ('V', 'I'), ('B', 'I'))
+
+    def test_multi_matches_single_colors(self):
+        with SN('sn1998a') as sn:
+            table = sn.lbol_bc_bh09_multi(self.colors, write=False)
+            bc_lcs = sn.bc_lcs
+        for filter1, filter2 in self.colors:
+            color_type = filter1 + "minus" + filter2
+            with SN('sn1998a') as sn:
+                sn.lbol_bc_bh09(filter1, filter2, write=False)
+            self.assertTrue(len(sn.bc_lc) > 0)
+            np.testing.assert_array_equal(bc_lcs[color_type], sn.bc_lc)
+
+            rows = np.isin(table['jd'], sn.bc_lc['jd'])
+            lbol = np.where(sn.bc_lc['lbol'] == -999, np.nan, sn.bc_lc['lbol'])
+            np.testing.assert_array_equal(table[color_type]['lbol'][rows],
+                                          lbol)
+            self.assertTrue(np.all(np.isnan(table[color_type]['lbol'][~rows])))
+
+    def test_unobserved_colors_are_nan(self):
+        with SN('sn2006v') as sn:
+            table = sn.lbol_bc_bh09_multi(self.colors, write=False)
+            self.assertTrue(len(table) > 0)
+            self.assertFalse(np.all(np.isnan(table['BminusV']['lbol'])))
+            for color_type in ('VminusI', 'BminusI'):
+                self.assertTrue(np.all(np.isnan(table[color_type]['lbol'])))
+                self.assertTrue(np.all(np.isnan(table[color_type]['lbol_err'])))
+                self.assertEqual(len(sn.bc_lcs[color_type]), 0)
+
+
+class TestSNStages(unittest.TestCase):
+
+    def setUp(self):
+        self.sn = SN('sn1998a')
+        self.stages = {}
+        for stage in ('_read_photometry', 'convert_magnitudes_to_fluxes',
+                      'deredden_fluxes', 'get_magnitudes', 'get_lbol_epochs'):
+            patcher = mock.patch.object(self.sn, stage,
+                                        wraps=getattr(self.sn, stage))
+            self.stages[stage] = patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.sn.close()
+
+    def run_methods(self):
+        self.sn.lqbol(write=False)
+        self.sn.lbol_direct_bh09(write=False)
+        self.sn.lbol_bc_bh09_multi(write=False)
+
+    def call_counts(self):
+        counts = dict((stage, stage_mock.call_count)
+                      for stage, stage_mock in self.stages.items())
+        for stage_mock in self.stages.values():
+            stage_mock.reset_mock()
+        return counts
+
+    def test_methods_share_stages(self):
+        self.run_methods()
+        self.assertEqual(self.call_counts(),
+                         {'_read_photometry': 1,
+                          'convert_magnitudes_to_fluxes': 1,
+                          'deredden_fluxes': 1, 'get_magnitudes': 1,
+                          'get_lbol_epochs': 1})
+
+    def test_changing_Rv_only_recomputes_fluxes(self):
+        self.run_methods()
+        self.call_counts()
+        self.sn.Rv = 2.5
+        self.run_methods()
+        self.assertEqual(self.call_counts(),
+                         {'_read_photometry': 0,
+                          'convert_magnitudes_to_fluxes': 1,
+                          'deredden_fluxes': 1, 'get_magnitudes': 0,
+                          'get_lbol_epochs': 1})
+
+    def test_changing_min_num_obs_only_recomputes_epochs(self):
+        self.run_methods()
+        self.call_counts()
+        self.sn.min_num_obs = 5
+        self.run_methods()
+        self.assertEqual(self.call_counts(),
+                         {'_read_photometry': 0,
+                          'convert_magnitudes_to_fluxes': 0,
+                          'deredden_fluxes': 0, 'get_magnitudes': 0,
+                          'get_lbol_epochs': 1})
+
+    def test_assigning_photometry_recomputes_stages(self):
+        self.run_methods()
+        snapshot = self.sn.snapshot()
+        self.call_counts()
+        for _ in range(3):
+            # New arrays may be given the ids of freed ones
+            self.sn.phot = np.array(snapshot.photometry)
+            self.run_methods()
+            self.assertEqual(self.call_counts()['_read_photometry'], 1)
+        self.sn.filters = self.sn.filters.copy()
+        self.run_methods()
+        self.assertEqual(self.call_counts()['_read_photometry'], 1)
+
+    def test_shared_filters_are_read_only(self):
+        self.assertFalse(self.sn.filters.flags.writeable)
+
+    def test_changing_Av_host_recomputes_dereddened_stages(self):
+        self.run_methods()
+        fluxes = self.sn.fluxes.copy()
+        self.call_counts()
+        self.sn.parameters['Av_host'][0] += 0.5
+        self.run_methods()
+        self.assertEqual(self.call_counts(),
+                         {'_read_photometry': 0,
+                          'convert_magnitudes_to_fluxes': 1,
+                          'deredden_fluxes': 1, 'get_magnitudes': 1,
+                          'get_lbol_epochs': 1})
+        self.assertTrue(np.all(self.sn.fluxes['flux'] > fluxes['flux']))
+
+
+class TestSNFilterNames(unittest.TestCase):
+
+    def test_lbol_direct_bh09_excludes_z_band(self):
+        with superbol.sn.SN('wd') as sn:
+            self.assertIn('z', sn.fluxes['name'])
+            with mock.patch.object(sn, 'fit_blackbodies',
+                                   wraps=sn.fit_blackbodies) as fit:
+                sn.lbol_direct_bh09(write=False)
+        epochs = fit.call_args[0][1]
+        self.assertTrue(len(epochs) > 0)
+        for names, wavelengths, fluxes, flux_errs in epochs:
+            self.assertNotIn('z', names)
+
+    def test_lbol_direct_bh09_sets_linear_uv_correction(self):
+        corrections = superbol.sn.unobserved_flux_corrections
+        with mock.patch.object(superbol.sn, 'unobserved_flux_corrections',
+                               wraps=corrections) as correct:
+            with superbol.sn.SN('sn2000cb') as sn:
+                sn.lbol_direct_bh09(write=False)
+        linear_uv = correct.call_args[0][-1]
+        self.assertTrue(np.any(linear_uv))
+        self.assertEqual(len(linear_uv), len(sn.lc))
+
+if __name__ == '__main__':
+    unittest.main()
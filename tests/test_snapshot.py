@@ -0,0 +1,58 @@
+import unittest
+import pickle
+import numpy as np
+from .context import superbol
+from superbol.sn import SN
+from superbol.snapshot import SNSnapshot
+
+
+class TestSNSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.sn = SN('sn1998a')
+        self.snapshot = self.sn.snapshot()
+
+    def tearDown(self):
+        self.sn.close()
+
+    def test_snapshot_is_immutable(self):
+        self.assertRaises(AttributeError, setattr, self.snapshot, 'name',
+                          'sn2000cb')
+        self.assertFalse(self.snapshot.photometry.flags.writeable)
+
+    def test_snapshot_does_not_follow_changes_to_sn(self):
+        self.sn.filters = self.sn.filters.copy()
+        snapshot = self.sn.snapshot()
+        self.sn.filters['eff_wl'] += 1.0
+        np.testing.assert_array_equal(snapshot.filters, self.snapshot.filters)
+
+    def test_snapshot_views_read_only_arrays(self):
+        result = SNSnapshot(self.snapshot.name, self.snapshot.photometry,
+                            self.snapshot.filters, self.snapshot.parameters)
+        self.assertTrue(np.shares_memory(result.photometry,
+                                         self.snapshot.photometry))
+
+    def test_snapshot_pickles(self):
+        result = pickle.loads(pickle.dumps(self.snapshot))
+        self.assertIsInstance(result, SNSnapshot)
+        self.assertEqual(result.name, self.snapshot.name)
+        np.testing.assert_array_equal(result.photometry,
+                                      self.snapshot.photometry)
+        np.testing.assert_array_equal(result.parameters,
+                                      self.snapshot.parameters)
+
+    def test_lqbol_from_snapshot_matches_database(self):
+        self.sn.lqbol(write=False)
+        result = SN.from_snapshot(pickle.loads(pickle.dumps(self.snapshot)))
+        result.lqbol(write=False)
+        np.testing.assert_array_equal(result.qbol_lc, self.sn.qbol_lc)
+
+    def test_sn_pickles_through_snapshot(self):
+        self.sn.min_num_obs = 5
+        result = pickle.loads(pickle.dumps(self.sn))
+        self.assertEqual(result.name, 'sn1998a')
+        self.assertEqual(result.min_num_obs, 5)
+        self.assertIsNone(result.phot_table)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import pickle
+import subprocess
+import sys
+import numpy as np
+from .context import superbol
+from superbol.sn import SN
+from superbol.store import PhotometryStore, _attach_untracked
+
+
+class TestPhotometryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.names = ['sn1987a', 'sn1998a', 'sn2000cb']
+
+    def check_store(self, store):
+        self.assertEqual(store.names, ['sn1998a', 'sn2000cb'])
+        with SN('sn2000cb') as sn:
+            phot = sn.phot_table.read()
+        snapshot = store.snapshot('sn2000cb')
+        for field in ('filter_id', 'jd', 'magnitude', 'uncertainty'):
+            np.testing.assert_array_equal(snapshot.photometry[field],
+                                          phot[field])
+        self.assertRaises(KeyError, store.snapshot, 'sn1987a')
+
+    def test_shared_memory_store(self):
+        with PhotometryStore.create(self.names) as store:
+            self.check_store(store)
+
+    def test_memmap_store(self):
+        with PhotometryStore.create(self.names, backend='memmap') as store:
+            self.check_store(store)
+
+    def test_pickled_store_shares_data(self):
+        with PhotometryStore.create(self.names) as store:
+            result = pickle.loads(pickle.dumps(store))
+            self.assertEqual(result.names, store.names)
+            np.testing.assert_array_equal(result.photometry, store.photometry)
+
+    def test_lqbol_from_store_matches_database(self):
+        with SN('sn1998a') as sn:
+            sn.lqbol(write=False)
+            expected = sn.qbol_lc
+        with PhotometryStore.create(self.names) as store:
+            result = SN.from_snapshot(store.snapshot('sn1998a'))
+            result.lqbol(write=False)
+        np.testing.assert_array_equal(result.qbol_lc, expected)
+
+    def run_python(self, code, stdin=b''):
+        # A fresh interpreter, so that the resource tracker's complaints on
+        # its stderr are captured
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.path.dirname(
+            os.path.dirname(os.path.abspath(superbol.__file__)))
+        return subprocess.run([sys.executable, '-W', 'error', '-c', code],
+                              input=stdin, capture_output=True, env=env)
+
+    def test_run_catalog_with_shared_memory_leaves_no_warnings(self):
+        code = (
+            "import multiprocessing\n"
+            "from superbol.catalog import run_catalog\n"
+            "if __name__ == '__main__':\n"
+            "    for method in ('fork', 'spawn'):\n"
+            "        result, failures = run_catalog(\n"
+            "            ['sn1998a', 'sn2000cb'], methods=('qbol',),\n"
+            "            max_workers=2, store='shared_memory',\n"
+            "            mp_context=multiprocessing.get_context(method))\n"
+            "        assert len(result) > 0 and not failures\n")
+        result = self.run_python(code)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stderr, b'')
+
+    def test_process_attaching_to_store_does_not_free_it(self):
+        with PhotometryStore.create(self.names) as store:
+            result = self.run_python(
+                "import pickle, sys\n"
+                "store = pickle.loads(sys.stdin.buffer.read())\n"
+                "print(len(store.photometry))\n",
+                stdin=pickle.dumps(store))
+            self.assertEqual(result.stderr, b'')
+            self.assertEqual(int(result.stdout), len(store.photometry))
+            # Still there to attach to
+            block = _attach_untracked(store._spec['photometry'][0])
+            block.close()
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, PhotometryStore.create, self.names,
+                          backend='nope')
+
+if __name__ == '__main__':
+    unittest.main()